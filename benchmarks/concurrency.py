@@ -0,0 +1,220 @@
+"""
+Concurrency benchmark for the gunicorn worker classes.
+
+Starts the real app under gunicorn (using gunicorn.conf.py) once per worker
+class with the same number of worker processes, then drives it with a mix of
+``download_file`` and ``submit_assignment`` uploads from many concurrent
+clients. A few "slow" clients trickle their upload bodies the way phones on
+bad connections do; with sync workers each of those pins a whole process.
+
+Usage (from the repository root):
+
+    python benchmarks/concurrency.py
+    python benchmarks/concurrency.py --modes sync,gthread,gevent --clients 32 --slow-clients 4
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import summarize  # noqa: E402
+from seed import REPO_ROOT, bootstrap_app, seed_database  # noqa: E402
+
+
+# ======================================================
+# HTTP CLIENT
+# ======================================================
+
+def _multipart(fields, file_field, filename, payload):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: application/pdf\r\n\r\n'.encode() + payload + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def upload_assignment(port, i, payload, trickle=None):
+    body, content_type = _multipart({
+        "name": f"Concurrency {i}",
+        "email": f"concurrency{i}@mylife.unisa.ac.za",
+        "contact": "+27 12 345 6789",
+        "university": "University of South Africa (UNISA)",
+        "assignment_type": "Essay",
+        "subject": "INF3708 - Advanced Databases",
+        "due_date": (date.today() + timedelta(days=14)).strftime("%Y-%m-%d"),
+        "details": "Concurrency benchmark submission",
+    }, "file", f"concurrency_{i}.pdf", payload)
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    conn.putrequest("POST", "/submit-assignment")
+    conn.putheader("Content-Type", content_type)
+    conn.putheader("Content-Length", str(len(body)))
+    conn.endheaders()
+    if trickle:
+        chunk_size, delay = trickle
+        for offset in range(0, len(body), chunk_size):
+            conn.send(body[offset:offset + chunk_size])
+            time.sleep(delay)
+    else:
+        conn.send(body)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status
+
+
+def download(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status
+
+
+# ======================================================
+# SERVER
+# ======================================================
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, workers, workdir, database_url):
+    port = _free_port()
+    env = dict(os.environ,
+               PORT=str(port),
+               DATABASE_URL=database_url,
+               DEADLINE_SCHEDULER_ENABLED="0",
+               # Seeded deadlines reach 180 days back; archiving them mid-run would change the data
+               ARCHIVE_SCHEDULER_ENABLED="0",
+               GUNICORN_WORKER_CLASS=mode,
+               WEB_CONCURRENCY=str(workers))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_ROOT, "gunicorn.conf.py"),
+         "--pythonpath", REPO_ROOT, "main:app"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if download(port, "/") == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({mode}) did not start")
+
+
+# ======================================================
+# RUN
+# ======================================================
+
+def run_mode(mode, args, workdir, database_url, files):
+    process, port = start_server(mode, args.workers, workdir, database_url)
+    payload = os.urandom(args.upload_kb * 1024)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def fast_request(i):
+        t0 = time.perf_counter()
+        try:
+            if i % 2:
+                status = upload_assignment(port, i, payload)
+                ok = status in (200, 302)
+            else:
+                status = download(port, f"/download/assignments/{files[i % len(files)]}")
+                ok = status == 200
+        except OSError:
+            ok = False
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors[0] += 1
+
+    def slow_client(n):
+        i = 0
+        while not stop.is_set():
+            try:
+                upload_assignment(port, f"slow{n}_{i}", payload, trickle=(8 * 1024, args.trickle_delay))
+            except OSError:
+                pass
+            i += 1
+
+    slow_threads = [threading.Thread(target=slow_client, args=(n,), daemon=True) for n in range(args.slow_clients)]
+    for thread in slow_threads:
+        thread.start()
+    time.sleep(0.5)
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            list(pool.map(fast_request, range(args.requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        stop.set()
+        process.terminate()
+        process.wait(timeout=30)
+
+    return summarize(latencies, elapsed, errors[0])
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--modes", default="sync,gthread,gevent")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn processes for every mode")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent fast clients")
+    parser.add_argument("--slow-clients", type=int, default=4, help="clients trickling their uploads")
+    parser.add_argument("--trickle-delay", type=float, default=0.05, help="seconds between 8KB chunks")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--file-kb", type=int, default=512, help="size of the files being downloaded")
+    parser.add_argument("--volume", type=int, default=2000)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "academic_assist_concurrency"))
+    args = parser.parse_args(argv)
+
+    main = bootstrap_app(args.workdir)
+    seeded = seed_database(main, args.volume, files_per_service=20, file_size=args.file_kb * 1024)
+    database_url = os.environ["DATABASE_URL"]
+    files = seeded["files"]["assignments"]
+
+    results = {}
+    print(f"{'mode':<10}{'reqs':>6}{'err':>5}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        result = run_mode(mode, args, args.workdir, database_url, files)
+        results[mode] = result
+        print(f"{mode:<10}{result['requests']:>6}{result['errors']:>5}{result['throughput_rps']:>10}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+
+    if "sync" in results:
+        base = results["sync"]["throughput_rps"] or 1
+        for mode, result in results.items():
+            if mode != "sync":
+                print(f"{mode}: {result['throughput_rps'] / base:.1f}x sync throughput")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
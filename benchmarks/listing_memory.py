@@ -0,0 +1,98 @@
+"""
+Memory benchmark for the dashboard listing queries.
+
+Compares loading every request as a full ORM entity (the old dashboard) with
+the column-projected ``__slots__`` rows from ``load_listing``. Both sides also
+attach the file-existence flags the dashboard adds to each row.
+
+Usage (from the repository root):
+
+    python benchmarks/listing_memory.py --volume 100k
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import bootstrap_app, parse_volume, seed_database  # noqa: E402
+
+
+def load_entities(main):
+    assignments = main.Assignment.query.order_by(main.Assignment.due_date.desc()).all()
+    quizzes = main.QuizRequest.query.order_by(main.QuizRequest.test_date.desc()).all()
+    exams = main.ExamRequest.query.order_by(main.ExamRequest.exam_date.desc()).all()
+    for a in assignments:
+        a.assignment_file_exists = False
+        a.payment_file_exists = False
+    for q in quizzes:
+        q.quiz_file_exists = False
+        q.payment_file_exists = False
+    for e in exams:
+        e.exam_file_exists = False
+        e.payment_file_exists = False
+    return assignments, quizzes, exams
+
+
+def load_rows(main):
+    assignments = main.load_listing(main.AssignmentRow, main.Assignment, main.Assignment.due_date.desc())
+    quizzes = main.load_listing(main.QuizRow, main.QuizRequest, main.QuizRequest.test_date.desc())
+    exams = main.load_listing(main.ExamRow, main.ExamRequest, main.ExamRequest.exam_date.desc())
+    for a in assignments:
+        a.assignment_file_exists = False
+        a.payment_file_exists = False
+    for q in quizzes:
+        q.quiz_file_exists = False
+        q.payment_file_exists = False
+    for e in exams:
+        e.exam_file_exists = False
+        e.payment_file_exists = False
+    return assignments, quizzes, exams
+
+
+def measure(main, loader):
+    with main.app.app_context():
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        result = loader(main)
+        elapsed = time.perf_counter() - t0
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows = sum(len(items) for items in result)
+        del result
+        main.db.session.remove()
+    return {"rows": rows, "seconds": elapsed, "retained_mb": retained / 2 ** 20, "peak_mb": peak / 2 ** 20}
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--volume", default="100k")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "academic_assist_listing"))
+    args = parser.parse_args(argv)
+
+    main = bootstrap_app(args.workdir)
+    seed_database(main, parse_volume(args.volume), files_per_service=5)
+
+    results = {
+        "orm entities": measure(main, load_entities),
+        "projected rows": measure(main, load_rows),
+    }
+
+    print(f"{'loader':<16}{'rows':>9}{'seconds':>10}{'retained MB':>14}{'peak MB':>10}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['rows']:>9}{r['seconds']:>10.2f}{r['retained_mb']:>14.1f}{r['peak_mb']:>10.1f}")
+
+    old, new = results["orm entities"], results["projected rows"]
+    print(f"\nretained memory: {old['retained_mb'] / new['retained_mb']:.1f}x smaller, "
+          f"load time: {old['seconds'] / new['seconds']:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,297 @@
+"""
+Load test for the AcademicAssist Flask app.
+
+Seeds a throwaway SQLite database with synthetic requests and upload files,
+then drives the real app (through its WSGI test client) across the dashboard,
+submission, payment upload, file download and PDF routes. Each scenario
+reports throughput and p50/p95/p99 latency, and the run fails when a scenario
+regresses past the stored baseline.
+
+Usage (from the repository root):
+
+    python benchmarks/load_test.py --volume 10k
+    python benchmarks/load_test.py --volume 100k --scenarios dashboard,download_file
+    python benchmarks/load_test.py --volume 10k --update-baseline
+
+Baselines are stored per volume in benchmarks/baseline.json. Refresh them on
+the machine that runs the comparison; numbers do not travel between hosts.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import bootstrap_app, parse_volume, seed_database  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+# ======================================================
+# STATS
+# ======================================================
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, elapsed, errors):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+    }
+
+
+# ======================================================
+# SCENARIOS
+# ======================================================
+
+def _upload(name, size=32 * 1024):
+    # Unique content per file, or repeated proof uploads would be
+    # answered as duplicates without storing anything
+    return (BytesIO(b"%PDF-1.4\n%" + name.encode() + b"\n" + b"0" * size), name)
+
+
+def _future(days=14):
+    return (date.today() + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def _login(client):
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+
+
+def scenario_dashboard(client, ctx, i):
+    return client.get("/dashboard")
+
+
+def scenario_submit_assignment(client, ctx, i):
+    return client.post("/submit-assignment", content_type="multipart/form-data", data={
+        "name": f"Load Test {i}",
+        "email": f"load{i}@mylife.unisa.ac.za",
+        "contact": "+27 12 345 6789",
+        "university": "University of South Africa (UNISA)",
+        "assignment_type": "Essay",
+        "subject": "INF3708 - Advanced Databases",
+        "due_date": _future(),
+        "details": "Benchmark submission " * 20,
+        "file": _upload(f"load_assignment_{i}.pdf"),
+    })
+
+
+def scenario_submit_quiz(client, ctx, i):
+    return client.post("/submit-quiz", content_type="multipart/form-data", data={
+        "name": f"Load Test {i}",
+        "email": f"load{i}@mylife.unisa.ac.za",
+        "contact": "+27 12 345 6789",
+        "university": "University of South Africa (UNISA)",
+        "subject": "COS3711 - Advanced Programming",
+        "quiz_type": "Online Quiz",
+        "test_date": _future(),
+        "topics": "Benchmark topics " * 20,
+        "file": _upload(f"load_quiz_{i}.pdf"),
+    })
+
+
+def scenario_submit_exam(client, ctx, i):
+    return client.post("/submit-exam", content_type="multipart/form-data", data={
+        "name": f"Load Test {i}",
+        "email": f"load{i}@mylife.unisa.ac.za",
+        "contact": "+27 12 345 6789",
+        "university": "University of South Africa (UNISA)",
+        "subject": "MAT2611 - Linear Algebra",
+        "exam_type": "Final Exam",
+        "exam_date": _future(),
+        "topics": "Benchmark topics " * 20,
+        "file": _upload(f"load_exam_{i}.pdf"),
+    })
+
+
+def setup_upload_proof(client, ctx):
+    scenario_submit_assignment(client, ctx, "proof")
+
+
+def scenario_upload_proof(client, ctx, i):
+    return client.post("/upload-proof", content_type="multipart/form-data", data={
+        "proof": _upload(f"load_proof_{i}.pdf"),
+    })
+
+
+def scenario_download_file(client, ctx, i):
+    files = ctx["files"]["assignments"]
+    return client.get(f"/download/assignments/{files[i % len(files)]}")
+
+
+def _pdf_scenario(kind, service):
+    def run(client, ctx, i):
+        ids = ctx["ids"][service]
+        return client.get(f"/download-pdf/{kind}/{ids[i % len(ids)]}")
+    return run
+
+
+def scenario_download_all_pdf(client, ctx, i):
+    return client.get("/download-all-pdf/" + ["assignments", "quizzes", "exams"][i % 3])
+
+
+# name -> (runner, default iterations, needs admin login, optional setup)
+SCENARIOS = {
+    "dashboard": (scenario_dashboard, 10, True, None),
+    "submit_assignment": (scenario_submit_assignment, 200, False, None),
+    "submit_quiz": (scenario_submit_quiz, 200, False, None),
+    "submit_exam": (scenario_submit_exam, 200, False, None),
+    "upload_proof": (scenario_upload_proof, 200, False, setup_upload_proof),
+    "download_file": (scenario_download_file, 500, False, None),
+    "download_assignment_pdf": (_pdf_scenario("assignment", "assignments"), 200, True, None),
+    "download_quiz_pdf": (_pdf_scenario("quiz", "quizzes"), 200, True, None),
+    "download_exam_pdf": (_pdf_scenario("exam", "exams"), 200, True, None),
+    "download_all_pdf": (scenario_download_all_pdf, 3, True, None),
+}
+
+
+def sample_ids(main, limit=500):
+    with main.app.app_context():
+        return {
+            "assignments": [r.id for r in main.db.session.query(main.Assignment.id).limit(limit)],
+            "quizzes": [r.id for r in main.db.session.query(main.QuizRequest.id).limit(limit)],
+            "exams": [r.id for r in main.db.session.query(main.ExamRequest.id).limit(limit)],
+        }
+
+
+def run_scenario(main, name, ctx, iterations, warmup):
+    runner, _, needs_login, setup = SCENARIOS[name]
+    client = main.app.test_client()
+    if needs_login:
+        _login(client)
+    if setup:
+        setup(client, ctx)
+
+    for i in range(warmup):
+        runner(client, ctx, -1 - i)
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        response = runner(client, ctx, i)
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code >= 400:
+            errors += 1
+        response.close()
+    elapsed = time.perf_counter() - started
+
+    return summarize(latencies, elapsed, errors)
+
+
+# ======================================================
+# BASELINE
+# ======================================================
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def find_regressions(results, baseline, tolerance):
+    """Compare p95 latency and throughput against the baseline for each scenario."""
+    regressions = []
+    for name, result in results.items():
+        ref = baseline.get(name)
+        if not ref:
+            continue
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} failed requests")
+        if result["p95_ms"] > ref["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']}ms > baseline {ref['p95_ms']}ms")
+        if result["throughput_rps"] < ref["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput_rps']}/s < baseline {ref['throughput_rps']}/s")
+    return regressions
+
+
+# ======================================================
+# ENTRY POINT
+# ======================================================
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--volume", default="10k", help="10k, 100k, 1m or a row count")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenario names")
+    parser.add_argument("--iterations", type=int, default=None, help="override iterations per scenario")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--files", type=int, default=50, help="upload files per service")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "academic_assist_bench"))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression, 0.25 = 25%%")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    volume_key = str(args.volume).lower()
+    volume = parse_volume(volume_key)
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    main = bootstrap_app(args.workdir)
+    print(f"Seeding {volume} requests into {args.workdir} ...")
+    t0 = time.perf_counter()
+    seeded = seed_database(main, volume, files_per_service=args.files, seed=args.seed)
+    print(f"Seeded in {time.perf_counter() - t0:.1f}s: {seeded['counts']}")
+
+    ctx = {"files": seeded["files"], "ids": sample_ids(main)}
+
+    results = {}
+    print(f"{'scenario':<26}{'reqs':>6}{'err':>5}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in names:
+        iterations = args.iterations or SCENARIOS[name][1]
+        result = run_scenario(main, name, ctx, iterations, args.warmup)
+        results[name] = result
+        print(f"{name:<26}{result['requests']:>6}{result['errors']:>5}{result['throughput_rps']:>10}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump({"volume": volume_key, "results": results}, fh, indent=2)
+
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline:
+        baseline.setdefault(volume_key, {}).update(results)
+        with open(args.baseline, "w") as fh:
+            json.dump(baseline, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"Baseline for {volume_key} written to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline.get(volume_key, {}), args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+
+    print("\nNo regressions against baseline." if baseline.get(volume_key) else
+          f"\nNo baseline stored for {volume_key}; run with --update-baseline to record one.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,250 @@
+"""
+Microbenchmark for PDF rendering.
+
+Compares the old per-call renderers (a stylesheet, ParagraphStyles and
+TableStyles built inside every call, kept below as ``legacy_*``) with the
+declarative renderers in reports.py, which build them once per process.
+Both produce the same bytes; this checks that first, then reports the
+mean/p95 render time per document and, in a separate tracemalloc pass, the
+peak memory allocated per document.
+
+Usage (from the repository root):
+
+    python benchmarks/pdf_render.py
+    python benchmarks/pdf_render.py --documents 500 --rows 200
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab import rl_config  # noqa: E402
+from reportlab.lib import colors  # noqa: E402
+from reportlab.lib.pagesizes import letter  # noqa: E402
+from reportlab.lib.units import inch  # noqa: E402
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle  # noqa: E402
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle  # noqa: E402
+
+import reports  # noqa: E402
+from load_test import percentile  # noqa: E402
+
+# Same bytes for the same input, so old and new output can be compared
+rl_config.invariant = 1
+
+
+# ======================================================
+# LEGACY RENDERERS
+# ======================================================
+
+def legacy_assignment_pdf(assignment):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=30)
+    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=12,
+                                   spaceAfter=6, spaceBefore=12)
+
+    elements.append(Paragraph("Assignment Details", title_style))
+    elements.append(Spacer(1, 20))
+
+    elements.append(Paragraph("Student Information", heading_style))
+    student_table = Table([
+        ["Name:", assignment.name],
+        ["Email:", assignment.email],
+        ["Contact:", assignment.contact],
+        ["University:", assignment.university]
+    ], colWidths=[1.5*inch, 4*inch])
+    student_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    elements.append(student_table)
+    elements.append(Spacer(1, 20))
+
+    elements.append(Paragraph("Assignment Details", heading_style))
+    assignment_table = Table([
+        ["Assignment Type:", assignment.assignment_type],
+        ["Subject:", assignment.subject],
+        ["Due Date:", assignment.due_date.strftime('%Y-%m-%d')],
+        ["Status:", assignment.status],
+        ["Created:", assignment.created_at.strftime('%Y-%m-%d %H:%M:%S')]
+    ], colWidths=[1.5*inch, 4*inch])
+    assignment_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    elements.append(assignment_table)
+    elements.append(Spacer(1, 20))
+
+    elements.append(Paragraph("Assignment Description", heading_style))
+    elements.append(Paragraph(assignment.details, styles["Normal"]))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def legacy_listing_pdf(items, generated_at):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=0.5*inch, rightMargin=0.5*inch)
+    elements = []
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=14, alignment=1,
+                                 spaceAfter=20)
+    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=10,
+                                   spaceAfter=6, spaceBefore=12)
+
+    elements.append(Paragraph("All Assignments Report", title_style))
+    elements.append(Spacer(1, 10))
+    elements.append(Paragraph(f"Generated on: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
+    elements.append(Spacer(1, 20))
+
+    table_data = [["ID", "Name", "Subject", "Due Date", "Status", "Created"]]
+    for item in items:
+        table_data.append([
+            str(item.id),
+            item.name[:20] + "..." if len(item.name) > 20 else item.name,
+            item.subject[:15] + "..." if len(item.subject) > 15 else item.subject,
+            item.due_date.strftime('%Y-%m-%d'),
+            item.status,
+            item.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        ])
+
+    table = Table(table_data, colWidths=[0.5*inch, 1.5*inch, 1.5*inch, 1*inch, 1.2*inch, 1*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 20))
+
+    status_count = {}
+    for item in items:
+        status_count[item.status] = status_count.get(item.status, 0) + 1
+
+    elements.append(Paragraph("Summary", heading_style))
+    for status, count in status_count.items():
+        elements.append(Paragraph(f"{status}: {count} requests", styles['Normal']))
+
+    elements.append(Spacer(1, 10))
+    elements.append(Paragraph(f"Total Requests: {len(items)}", styles['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# ======================================================
+# FIXTURES
+# ======================================================
+
+class Item:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+def make_assignment(i):
+    return Item(
+        id=i,
+        name=f"Student Number {i}",
+        email=f"student{i}@mylife.unisa.ac.za",
+        contact="+27 12 345 6789",
+        university="University of South Africa (UNISA)",
+        assignment_type="Research Paper",
+        subject="INF3708 - Advanced Databases",
+        due_date=date(2026, 11, 1) + timedelta(days=i % 30),
+        details="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 12,
+        status="Payment Submitted" if i % 3 else "Pending Payment",
+        created_at=datetime(2026, 10, 1, 9, 30) + timedelta(minutes=i),
+    )
+
+
+# ======================================================
+# RUN
+# ======================================================
+
+def measure(render, documents):
+    """Per-document timings, then a tracemalloc pass for memory."""
+    render(0)  # warm up imports and font metrics
+    gc.collect()
+
+    timings = []
+    for i in range(documents):
+        t0 = time.perf_counter()
+        render(i)
+        timings.append(time.perf_counter() - t0)
+
+    peaks = []
+    tracemalloc.start()
+    for i in range(min(documents, 50)):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        render(i)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "mean_ms": 1000 * sum(timings) / len(timings),
+        "p95_ms": 1000 * percentile(sorted(timings), 95),
+        "peak_kb": sum(peaks) / len(peaks) / 1024,
+    }
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--documents", type=int, default=300, help="documents rendered per case")
+    parser.add_argument("--rows", type=int, default=100, help="rows in the listing report")
+    args = parser.parse_args(argv)
+
+    generated_at = datetime(2026, 10, 19, 12, 0)
+    listing = [make_assignment(i) for i in range(args.rows)]
+
+    cases = {
+        "request details": (
+            lambda i: legacy_assignment_pdf(make_assignment(i)),
+            lambda i: reports.render_request_pdf("assignments", make_assignment(i)),
+        ),
+        f"listing ({args.rows} rows)": (
+            lambda i: legacy_listing_pdf(listing, generated_at),
+            lambda i: reports.render_listing_pdf("assignments", listing, generated_at),
+        ),
+    }
+
+    for name, (old, new) in cases.items():
+        if old(1) != new(1):
+            print(f"{name}: output differs between legacy and reports.py")
+            return 1
+
+    print(f"{'document':<22}{'renderer':<10}{'mean ms':>10}{'p95 ms':>10}{'peak KB':>10}")
+    for name, (old, new) in cases.items():
+        documents = args.documents if "details" in name else max(10, args.documents // 10)
+        before, after = measure(old, documents), measure(new, documents)
+        for label, result in (("legacy", before), ("reports", after)):
+            print(f"{name:<22}{label:<10}{result['mean_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['peak_kb']:>10.1f}")
+        print(f"{'':<22}{'':<10}{before['mean_ms'] / after['mean_ms']:>9.2f}x"
+              f"{'':>10}{before['peak_kb'] / after['peak_kb']:>9.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,176 @@
+"""
+Synthetic data for the AcademicAssist benchmarks.
+
+Everything here is deterministic for a given seed so two runs against the
+same volume see the same rows, the same upload files and the same mix of
+statuses and dates.
+"""
+
+import os
+import random
+import shutil
+import sys
+from datetime import date, datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VOLUMES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+# Share of the total volume given to each model
+SERVICE_SPLIT = {
+    "assignments": 0.4,
+    "quizzes": 0.3,
+    "exams": 0.3,
+}
+
+STATUSES = ["Pending Payment", "Payment Submitted", "In Progress", "Completed"]
+UNIVERSITIES = [
+    "University of South Africa (UNISA)",
+    "University of Pretoria",
+    "University of Johannesburg",
+    "Wits University",
+]
+SUBJECTS = [
+    "INF3708 - Advanced Databases",
+    "COS3711 - Advanced Programming",
+    "MAT2611 - Linear Algebra",
+    "ACN3073 - Accounting",
+    "PYC1501 - Basic Psychology",
+]
+
+BATCH_SIZE = 5000
+
+
+def parse_volume(value):
+    """Accept one of the named volumes ("10k", "100k", "1m") or a plain integer."""
+    key = str(value).lower()
+    if key in VOLUMES:
+        return VOLUMES[key]
+    return int(key)
+
+
+def bootstrap_app(workdir, database_url=None, fresh=True):
+    """
+    Import ``main`` against an isolated working directory and database.
+
+    ``main`` resolves its upload folders relative to the current directory and
+    creates its tables at import time, so both have to be pointed somewhere
+    disposable before the import happens.
+    """
+    if fresh and os.path.isdir(workdir):
+        shutil.rmtree(workdir)
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    os.environ["DATABASE_URL"] = database_url or "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["CACHE_PATH"] = os.path.join(workdir, "cache.sqlite")
+    # The load test gates render and query cost; cache hits would hide it
+    os.environ.setdefault("CACHE_BACKEND", "none")
+    # Seeding runs its own deadline pass; a background one would contend for the database
+    os.environ.setdefault("DEADLINE_SCHEDULER_ENABLED", "0")
+    # Benchmarks drive thousands of submissions from one client
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("UPLOAD_SWEEPER_ENABLED", "0")
+    os.environ["RATE_LIMIT_PATH"] = os.path.join(workdir, "limits.sqlite")
+
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    import main
+    return main
+
+
+def write_upload_files(upload_root, files_per_service, size_bytes, rng):
+    """Create ``files_per_service`` files in every upload folder and return their names."""
+    names = {}
+    for service in ["assignments", "quizzes", "exams", "payments"]:
+        folder = os.path.join(upload_root, service)
+        os.makedirs(folder, exist_ok=True)
+        names[service] = []
+        for i in range(files_per_service):
+            filename = f"bench_{service}_{i}.pdf"
+            with open(os.path.join(folder, filename), "wb") as fh:
+                fh.write(rng.randbytes(size_bytes))
+            names[service].append(filename)
+    return names
+
+
+def _common_fields(rng, index, today):
+    offset = rng.randint(-180, 60)
+    return {
+        "name": f"Student {index}",
+        "email": f"student{index}@mylife.unisa.ac.za",
+        "contact": f"+27 {rng.randint(100000000, 999999999)}",
+        "university": rng.choice(UNIVERSITIES),
+        "subject": rng.choice(SUBJECTS),
+        "status": rng.choice(STATUSES),
+        "created_at": datetime.combine(today + timedelta(days=min(offset, 0) - rng.randint(1, 14)),
+                                       datetime.min.time()),
+    }, today + timedelta(days=offset)
+
+
+def _pick_file(rng, files, ratio):
+    if files and rng.random() < ratio:
+        return rng.choice(files)
+    return None
+
+
+def seed_database(main, volume, files_per_service=50, file_size=64 * 1024,
+                  file_ratio=0.5, seed=1234):
+    """
+    Fill the three request tables with ``volume`` rows in total.
+
+    A ``file_ratio`` share of rows reference one of the generated upload files
+    and the same share reference a payment proof, so the file-existence checks
+    on the dashboard and ``download_file`` have real files to hit.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    upload_root = main.app.config["UPLOAD_FOLDER"]
+    files = write_upload_files(upload_root, files_per_service, file_size, rng)
+
+    counts = {service: int(volume * share) for service, share in SERVICE_SPLIT.items()}
+    counts["assignments"] += volume - sum(counts.values())
+
+    tables = {
+        "assignments": (main.Assignment, "due_date", "details", "assignment_file", "assignment_type",
+                        ["Essay", "Research Paper", "Case Study", "Project"]),
+        "quizzes": (main.QuizRequest, "test_date", "topics", "quiz_file", "quiz_type",
+                    ["Online Quiz", "Class Test", "Practical Test"]),
+        "exams": (main.ExamRequest, "exam_date", "topics", "exam_file", "exam_type",
+                  ["Mid-Semester", "Final Exam", "Supplementary"]),
+    }
+
+    index = 0
+    with main.app.app_context():
+        for service, (model, date_field, text_field, file_field, type_field, types) in tables.items():
+            batch = []
+            for _ in range(counts[service]):
+                row, deadline = _common_fields(rng, index, today)
+                row[date_field] = deadline
+                row[type_field] = rng.choice(types)
+                row[text_field] = "Lorem ipsum dolor sit amet. " * rng.randint(5, 40)
+                row[file_field] = _pick_file(rng, files[service], file_ratio)
+                row["proof_of_payment"] = _pick_file(rng, files["payments"], file_ratio)
+                batch.append(row)
+                index += 1
+
+                if len(batch) >= BATCH_SIZE:
+                    main.db.session.execute(model.__table__.insert(), batch)
+                    main.db.session.commit()
+                    batch = []
+
+            if batch:
+                main.db.session.execute(model.__table__.insert(), batch)
+                main.db.session.commit()
+
+        main.run_deadline_transitions()
+        # Rows were inserted in bulk, past the write paths that keep the rollups
+        main.rebuild_request_rollups()
+
+    return {"counts": counts, "files": files}
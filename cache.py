@@ -0,0 +1,325 @@
+"""
+Cache layer shared by the gunicorn workers.
+
+Entries live in a namespace ("dashboard", "reports", ...) so a write can
+drop everything derived from the data it touched. Two backends:
+
+    MemoryCache   in-process LRU with TTL. Fast, but every worker has its own
+                  copy, so invalidations only reach the worker that made them.
+                  Use it for single-process deployments.
+    SQLiteCache   one SQLite file shared by every worker on the node, so an
+                  invalidation in one worker is seen by all of them.
+
+``Cache`` wraps a backend and counts hits, misses, sets and invalidations.
+The counters are kept by the backend, so with SQLiteCache ``stats()`` adds
+up every worker on the node (each worker's latest second of counts may not
+have been written yet); with the other backends they cover this process.
+It also versions every namespace: entries are stored under the namespace's
+current generation token, and invalidating a namespace replaces the token.
+A value computed from data read before an invalidation is stored under the
+old token by ``get_or_set`` and is never served, however late it lands.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Backend namespace holding the current generation token of each namespace
+GENERATIONS = "_generations"
+
+
+class MemoryCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at < time.time():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace, key, value, ttl):
+        with self._lock:
+            self._entries[(namespace, key)] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def invalidate(self, namespace):
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[entry_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def add_counters(self, counts):
+        with self._lock:
+            for name, count in counts.items():
+                self._counters[name] = self._counters.get(name, 0) + count
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+class SQLiteCache:
+    # Expired/oversize entries are pruned on every Nth set rather than each one
+    PRUNE_EVERY = 64
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._sets = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL,"
+            " stored_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_stored_at ON cache (stored_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at and expires_at < time.time():
+            self.delete(namespace, key)
+            return None
+        return pickle.loads(value)
+
+    def set(self, namespace, key, value, ttl):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, stored_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl if ttl else None, now),
+        )
+        self._sets += 1
+        if self._sets % self.PRUNE_EVERY == 0:
+            self._prune(conn, now)
+        conn.commit()
+
+    def _prune(self, conn, now):
+        # Expired entries first, then the oldest ones past the size limit.
+        # Generation tokens are few and written rarely, so never the oldest
+        # to keep; losing one would drop its whole namespace.
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM cache WHERE rowid IN ("
+            " SELECT rowid FROM cache WHERE namespace != ? ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (GENERATIONS, self.max_entries),
+        )
+
+    def delete(self, namespace, key):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+        conn.commit()
+
+    def invalidate(self, namespace):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+        conn.commit()
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache")
+        conn.commit()
+
+    def add_counters(self, counts):
+        conn = self._conn()
+        conn.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?)"
+            " ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            counts.items(),
+        )
+        conn.commit()
+
+    def counters(self):
+        return dict(self._conn().execute("SELECT name, value FROM counters"))
+
+
+class NullCache:
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        return None
+
+    def set(self, namespace, key, value, ttl):
+        pass
+
+    def delete(self, namespace, key):
+        pass
+
+    def invalidate(self, namespace):
+        pass
+
+    def clear(self):
+        pass
+
+    def add_counters(self, counts):
+        with self._lock:
+            for name, count in counts.items():
+                self._counters[name] = self._counters.get(name, 0) + count
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+class Cache:
+    """Front end over a backend, counting hits, misses and invalidations."""
+
+    COUNTERS = ("hits", "misses", "sets", "invalidations")
+    # Counts are batched per process and written to the backend at most this
+    # often (seconds), so a cache hit doesn't cost a write
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, backend, default_ttl=300):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._pending = dict.fromkeys(self.COUNTERS, 0)
+        self._flushed_at = time.monotonic()
+
+    def _count(self, name):
+        with self._lock:
+            self._pending[name] += 1
+            if time.monotonic() - self._flushed_at < self.FLUSH_INTERVAL:
+                return
+            pending = self._take_pending()
+        self.backend.add_counters(pending)
+
+    def _take_pending(self):
+        # Caller holds self._lock
+        pending = {name: count for name, count in self._pending.items() if count}
+        self._pending = dict.fromkeys(self.COUNTERS, 0)
+        self._flushed_at = time.monotonic()
+        return pending
+
+    def flush_counters(self):
+        with self._lock:
+            pending = self._take_pending()
+        if pending:
+            self.backend.add_counters(pending)
+
+    def generation(self, namespace):
+        """
+        Current generation token of ``namespace``. Read it before computing
+        a value and pass it to ``set``.
+        """
+        token = self.backend.get(GENERATIONS, namespace)
+        if token is None:
+            # Never set or evicted: a fresh token hides anything stored under the lost one
+            token = self._new_generation(namespace)
+        return token
+
+    def _new_generation(self, namespace):
+        # Random rather than incremented, so two concurrent invalidations
+        # can never end up writing the same token
+        token = uuid.uuid4().hex
+        self.backend.set(GENERATIONS, namespace, token, 0)
+        return token
+
+    def get(self, namespace, key, generation=None):
+        generation = generation or self.generation(namespace)
+        value = self.backend.get(namespace, f"{generation}:{key}")
+        self._count("misses" if value is None else "hits")
+        return value
+
+    def set(self, namespace, key, value, ttl=None, generation=None):
+        generation = generation or self.generation(namespace)
+        self.backend.set(namespace, f"{generation}:{key}", value, self.default_ttl if ttl is None else ttl)
+        self._count("sets")
+
+    def get_or_set(self, namespace, key, compute, ttl=None, store=True):
+        """
+        Cached value of ``key``, computing it on a miss. It is stored under
+        the generation read before computing; ``store=False`` only reads.
+        """
+        generation = self.generation(namespace)
+        value = self.get(namespace, key, generation)
+        if value is None:
+            value = compute()
+            if store and value is not None:
+                self.set(namespace, key, value, ttl, generation)
+        return value
+
+    def delete(self, namespace, key):
+        self.backend.delete(namespace, f"{self.generation(namespace)}:{key}")
+        self._count("invalidations")
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self._new_generation(namespace)
+            # Entries under the old token are unreachable now; free them
+            self.backend.invalidate(namespace)
+            self._count("invalidations")
+
+    def stats(self):
+        self.flush_counters()
+        counters = dict.fromkeys(self.COUNTERS, 0)
+        counters.update(self.backend.counters())
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = round(counters["hits"] / lookups, 3) if lookups else 0.0
+        counters["backend"] = type(self.backend).__name__
+        counters["pid"] = os.getpid()
+        return counters
+
+
+def create_cache(config):
+    backend = config.get("CACHE_BACKEND", "sqlite")
+    max_entries = config.get("CACHE_MAX_ENTRIES", 1024)
+
+    if backend == "memory":
+        store = MemoryCache(max_entries)
+    elif backend == "sqlite":
+        store = SQLiteCache(config["CACHE_PATH"], max_entries)
+    elif backend == "none":
+        store = NullCache()
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+    return Cache(store, config.get("CACHE_DEFAULT_TTL", 300))
@@ -0,0 +1,158 @@
+"""
+Streaming ZIP export of requests.
+
+``stream_export()`` turns a sequence of ``ExportJob`` into the bytes of a ZIP
+file, yielded entry by entry so the response starts at once and nothing
+larger than one upload chunk is held in memory. The details PDF of each
+request is rendered in a process pool (reportlab is pure Python and holds
+the GIL), and entries are written in the order the renders complete, each
+followed by the request's upload and payment proof.
+"""
+
+import multiprocessing
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from reports import render_request_pdf
+
+# folder: directory inside the archive; values: columns for the PDF;
+# files: (name in the archive, storage service, stored filename)
+ExportJob = namedtuple("ExportJob", "service folder values files")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ZipStream:
+    """
+    Write-only file object for ``zipfile``. It has ``tell`` but no ``seek``,
+    so ZipFile writes data descriptors instead of seeking back, and whatever
+    was written since the last ``drain`` can be sent to the client.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def render_pool(workers):
+    """Process pool shared by every export in this (gunicorn worker) process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs request threads and holds
+            # database connections is not safe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+class _Rendered:
+    """Stand-in for a future when PDFs are rendered in-process."""
+
+    def __init__(self, service, values):
+        self._pdf = render_request_pdf(service, values)
+
+    def result(self):
+        return self._pdf
+
+    def cancel(self):
+        return False
+
+
+def stream_export(jobs, open_file, workers=0, window=None):
+    """
+    Yield a ZIP archive of ``jobs``. ``open_file(service, filename)`` opens
+    a stored upload for reading. With ``workers=0`` PDFs are rendered in
+    this process; otherwise at most ``window`` renders are in flight.
+    """
+    return (chunk for chunk in _stream_export(jobs, open_file, workers, window) if chunk)
+
+
+def _stream_export(jobs, open_file, workers, window):
+    pool = render_pool(workers) if workers else None
+    window = window or max(workers, 1) * 2
+    out = ZipStream()
+    archive = zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+    jobs = iter(jobs)
+    pending = {}
+
+    def submit():
+        job = next(jobs, None)
+        if job is None:
+            return False
+        if pool is not None:
+            future = pool.submit(render_request_pdf, job.service, job.values)
+        else:
+            future = _Rendered(job.service, job.values)
+        pending[future] = job
+        return True
+
+    try:
+        while len(pending) < window and submit():
+            pass
+
+        while pending:
+            if pool is not None:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            else:
+                done = list(pending)
+
+            for future in done:
+                job = pending.pop(future)
+                archive.writestr(f"{job.folder}/{job.folder.rsplit('/', 1)[-1]}_details.pdf", future.result())
+                yield out.drain()
+
+                for arcname, service, filename in job.files:
+                    yield from _write_upload(archive, out, f"{job.folder}/{arcname}", open_file, service, filename)
+
+                submit()
+
+        archive.close()
+        yield out.drain()
+    finally:
+        # Client went away: don't leave renders queued in the shared pool
+        for future in pending:
+            future.cancel()
+
+
+def _write_upload(archive, out, arcname, open_file, service, filename):
+    try:
+        src = open_file(service, filename)
+    except OSError:
+        # Missing uploads are left out rather than failing the whole export
+        return
+
+    # Uploads are PDFs, images and Office files that are already compressed;
+    # deflating them again costs CPU for nothing
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    with src, archive.open(info, mode="w") as dst:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            yield out.drain()
+    yield out.drain()
@@ -0,0 +1,96 @@
+"""
+Gunicorn settings for AcademicAssist.
+
+Uploads, downloads and PDF renders spend most of their time waiting on disk,
+the network or the database, so the default mode is a concurrent one:
+
+    GUNICORN_WORKER_CLASS=gthread  (default) CPU-sized processes x threads
+    GUNICORN_WORKER_CLASS=gevent   one process per CPU, greenlet per request
+    GUNICORN_WORKER_CLASS=sync     the old one-request-per-process behaviour
+
+WEB_CONCURRENCY, GUNICORN_THREADS and GUNICORN_WORKER_CONNECTIONS override
+the computed sizes.
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+if worker_class == "gevent":
+    default_workers = cpu_count
+elif worker_class == "gthread":
+    default_workers = cpu_count + 1
+else:
+    default_workers = cpu_count * 2 + 1
+
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers))
+threads = int(os.environ.get("GUNICORN_THREADS", 8 if worker_class == "gthread" else 1))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks (reportlab, PIL) can't accumulate
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+
+# The app must be imported after gevent has patched the standard library,
+# which only happens inside each worker
+preload_app = False
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    # Lets psycopg2 yield to other greenlets while it waits on the socket
+    from gevent.socket import wait_read, wait_write
+    import psycopg2.extensions
+
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            break
+        elif state == psycopg2.extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def on_starting(server):
+    # Create/upgrade the schema once, before any worker exists, instead of in
+    # every worker at import. It runs in a child process so the master never
+    # imports the app (see preload_app); workers inherit DATABASE_INITIALIZED
+    # and skip the set-up.
+    env = dict(os.environ, DATABASE_INITIALIZED="1",
+               PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    subprocess.run([sys.executable, "-m", "flask", "--app", "main", "init-db"], env=env, check=True)
+    os.environ["DATABASE_INITIALIZED"] = "1"
+
+
+def post_fork(server, worker):
+    os.environ["GUNICORN_WORKER_CLASS"] = worker_class
+    os.environ["GUNICORN_THREADS"] = str(threads)
+    os.environ["GUNICORN_WORKER_CONNECTIONS"] = str(worker_connections)
+
+    if worker_class == "gevent":
+        try:
+            import psycopg2.extensions
+        except ImportError:
+            return
+        psycopg2.extensions.set_wait_callback(_gevent_wait_callback)
+
+
+def post_worker_init(worker):
+    # Background jobs belong to serving processes only; importing main (flask
+    # commands, scripts) must not start them
+    from main import start_background_jobs
+    start_background_jobs()
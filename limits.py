@@ -0,0 +1,236 @@
+"""
+Admission control for the anonymous upload endpoints.
+
+``SQLiteLimiter`` keeps token buckets and concurrency slots in one SQLite
+file shared by every gunicorn worker on the node, so a client can't spread
+its requests over workers to get more than its share. ``AdmissionControl``
+is WSGI middleware that consults it before the app (and so before the
+request body) is touched:
+
+    429 Too Many Requests    a per-IP or per-session bucket is empty
+    503 Service Unavailable  the node already handles the maximum number
+                             of concurrent uploads
+
+Store errors fail open: a locked or broken limits file must not take the
+submission forms down with it.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate(value):
+    """ "20/3600" -> (20, 3600.0): bucket size and the seconds it takes to refill."""
+    count, _, period = value.partition("/")
+    return int(count), float(period or 60)
+
+
+class SQLiteLimiter:
+    # Full buckets and expired slots are pruned on every Nth call
+    PRUNE_EVERY = 256
+    enabled = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " full_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS slots ("
+            " token TEXT PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_slots_name ON slots (name, expires_at)")
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; transactions are opened explicitly with BEGIN IMMEDIATE
+            # so read-modify-write cycles from different workers serialize
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _prune(self, conn, now):
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            # A full bucket behaves exactly like a missing one
+            conn.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+            conn.execute("DELETE FROM slots WHERE expires_at < ?", (now,))
+
+    def take(self, buckets):
+        """
+        Take one token from each ``(key, capacity, period)`` bucket, or from
+        none of them if any is empty. Returns ``(allowed, retry_after)``
+        where ``retry_after`` is the seconds until the request would pass.
+        """
+        now = time.time()
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = []
+                retry_after = 0
+                for key, capacity, period in buckets:
+                    rate = capacity / period
+                    row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                    tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                    if tokens < 1:
+                        retry_after = max(retry_after, (1 - tokens) / rate)
+                    levels.append((key, tokens, capacity, rate))
+
+                allowed = retry_after == 0
+                conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                    [(key, tokens - allowed, now, now + (capacity - tokens + allowed) / rate)
+                     for key, tokens, capacity, rate in levels],
+                )
+                self._prune(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            logger.exception("Rate limit store unavailable, letting the request through")
+            return True, 0
+
+        return allowed, retry_after
+
+    def acquire(self, name, limit, ttl):
+        """
+        Take one of ``limit`` slots called ``name``. Returns a token for
+        ``release`` or None when all are taken. Slots left behind by killed
+        workers expire after ``ttl`` seconds.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM slots WHERE name = ? AND expires_at < ?", (name, now))
+                (in_use,) = conn.execute("SELECT COUNT(*) FROM slots WHERE name = ?", (name,)).fetchone()
+                if in_use >= limit:
+                    token = None
+                else:
+                    conn.execute("INSERT INTO slots (token, name, expires_at) VALUES (?, ?, ?)",
+                                 (token, name, now + ttl))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            logger.exception("Rate limit store unavailable, letting the request through")
+            return ""
+
+        return token
+
+    def release(self, token):
+        if not token:
+            return
+        try:
+            self._conn().execute("DELETE FROM slots WHERE token = ?", (token,))
+        except sqlite3.Error:
+            logger.exception("Could not release upload slot; it expires on its own")
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM buckets")
+        conn.execute("DELETE FROM slots")
+
+
+class NullLimiter:
+    # AdmissionControl lets every request straight through
+    enabled = False
+
+    def take(self, buckets):
+        return True, 0
+
+    def acquire(self, name, limit, ttl):
+        return ""
+
+    def release(self, token):
+        pass
+
+    def clear(self):
+        pass
+
+
+def _reject(start_response, status, retry_after, message):
+    body = (
+        "<!DOCTYPE html><html><head><title>Please try again shortly</title></head>"
+        f"<body><h1>{status}</h1><p>{message}</p></body></html>"
+    ).encode()
+    start_response(status, [
+        ("Content-Type", "text/html; charset=utf-8"),
+        ("Content-Length", str(len(body))),
+        ("Retry-After", str(max(1, int(retry_after + 0.999)))),
+        # The unread request body makes the connection unusable
+        ("Connection", "close"),
+    ])
+    return [body]
+
+
+class AdmissionControl:
+    """
+    WSGI middleware limiting POSTs to ``paths``. ``buckets(environ)`` returns
+    the ``(key, capacity, period)`` token buckets the request must draw from.
+    """
+
+    def __init__(self, wsgi_app, limiter, paths, buckets, upload_limit=0, upload_ttl=120):
+        self.wsgi_app = wsgi_app
+        self.limiter = limiter
+        self.paths = frozenset(paths)
+        self.buckets = buckets
+        self.upload_limit = upload_limit
+        self.upload_ttl = upload_ttl
+
+    def __call__(self, environ, start_response):
+        if environ.get("REQUEST_METHOD") != "POST" or environ.get("PATH_INFO") not in self.paths \
+                or not self.limiter.enabled:
+            return self.wsgi_app(environ, start_response)
+
+        allowed, retry_after = self.limiter.take(self.buckets(environ))
+        if not allowed:
+            return _reject(start_response, "429 Too Many Requests", retry_after,
+                           "You have sent too many requests. Please wait a moment and try again.")
+
+        if not self.upload_limit:
+            return self.wsgi_app(environ, start_response)
+
+        slot = self.limiter.acquire("uploads", self.upload_limit, self.upload_ttl)
+        if slot is None:
+            return _reject(start_response, "503 Service Unavailable", 5,
+                           "We are handling a lot of uploads right now. Please try again in a few seconds.")
+
+        # The app reads the whole body and commits before returning, so the
+        # slot can go as soon as it does
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            self.limiter.release(slot)
+
+
+def create_limiter(config):
+    if not config.get("RATE_LIMIT_ENABLED", True):
+        return NullLimiter()
+    return SQLiteLimiter(config["RATE_LIMIT_PATH"])
@@ -1,22 +1,40 @@
+import atexit
+import csv
+import gzip
+import hashlib
 import os
 import secrets
+import shutil
+import socket
+import tempfile
+import threading
 from datetime import datetime, timedelta, date
 from functools import wraps
-from io import BytesIO
+from io import StringIO
 
+import click
 from flask import (
     Flask, render_template, request, redirect,
     url_for, session, flash, abort,
-    send_from_directory, make_response
+    send_from_directory, make_response,
+    Response, stream_with_context, jsonify
 )
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import delete, event, func, inspect, or_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from itsdangerous import BadSignature
+from werkzeug.http import parse_cookie
 from werkzeug.utils import secure_filename
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from database import REPLICA_BIND, RoutingSession, engine_options, read_replica, reads_from_replica, sqlite_pragmas
+from cache import create_cache
+from exports import ExportJob, stream_export
+from limits import AdmissionControl, create_limiter, parse_rate
+from reports import LISTING_LAYOUTS, render_analytics_pdf, render_listing_pdf, render_request_pdf
+from storage import create_storage
 
 # ======================================================
 # FLASK APP (THIS FIXES YOUR GUNICORN ERROR)
@@ -40,11 +58,102 @@ else:
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///academic_assist.db"
 
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+# Under the threaded/gevent gunicorn workers (gunicorn.conf.py) one process
+# serves many requests at once. Sessions are already scoped per request by
+# Flask-SQLAlchemy; the pool just needs enough connections that concurrent
+# requests don't queue on it. DB_POOL_* override the computed sizes.
+if os.environ.get("GUNICORN_WORKER_CLASS") == "gevent":
+    WORKER_CONCURRENCY = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))
+else:
+    WORKER_CONCURRENCY = int(os.environ.get("GUNICORN_THREADS", 1))
+
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+    app.config["SQLALCHEMY_DATABASE_URI"], WORKER_CONCURRENCY
+)
+
+# Optional read replica; routes marked @read_replica query it instead
+READ_REPLICA_URL = os.environ.get("READ_REPLICA_URL")
+if READ_REPLICA_URL and READ_REPLICA_URL.startswith("postgres://"):
+    READ_REPLICA_URL = READ_REPLICA_URL.replace("postgres://", "postgresql://", 1)
+
+if READ_REPLICA_URL:
+    app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: READ_REPLICA_URL}
 app.config["UPLOAD_FOLDER"] = "static/uploads"
 app.config["ALLOWED_EXTENSIONS"] = {"pdf", "png", "jpg", "jpeg", "doc", "docx"}
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-db = SQLAlchemy(app)
+# "local" keeps uploads under UPLOAD_FOLDER, "s3" keeps them in a bucket and
+# lets browsers upload/download through presigned URLs
+app.config["STORAGE_BACKEND"] = os.environ.get("STORAGE_BACKEND", "local")
+app.config["S3_BUCKET"] = os.environ.get("S3_BUCKET")
+app.config["S3_PREFIX"] = os.environ.get("S3_PREFIX", "uploads/")
+app.config["S3_ENDPOINT_URL"] = os.environ.get("S3_ENDPOINT_URL")
+app.config["S3_REGION"] = os.environ.get("S3_REGION")
+app.config["S3_ACCESS_KEY_ID"] = os.environ.get("S3_ACCESS_KEY_ID")
+app.config["S3_SECRET_ACCESS_KEY"] = os.environ.get("S3_SECRET_ACCESS_KEY")
+app.config["PRESIGNED_URL_EXPIRY"] = int(os.environ.get("PRESIGNED_URL_EXPIRY", 300))
+
+# "sqlite" is shared by every worker on the node, "memory" is per process
+# (single-worker only), "none" disables caching. Pages read from
+# READ_REPLICA_URL are never cached, since the replica may lag behind the
+# invalidation of the latest write.
+app.config["CACHE_BACKEND"] = os.environ.get("CACHE_BACKEND", "sqlite")
+app.config["CACHE_PATH"] = os.environ.get("CACHE_PATH", os.path.join(app.instance_path, "cache.sqlite"))
+app.config["CACHE_DEFAULT_TTL"] = int(os.environ.get("CACHE_DEFAULT_TTL", 300))
+app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+
+# Admission control for the anonymous submission and proof upload forms.
+# Buckets and upload slots live in one SQLite file shared by every worker
+# on the node. Rates are "requests/seconds". RATE_LIMIT_PROXY_COUNT is the
+# number of proxies in front of the app that append to X-Forwarded-For
+# (the platform router); 0 trusts only the socket address.
+app.config["RATE_LIMIT_ENABLED"] = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+app.config["RATE_LIMIT_PATH"] = os.environ.get("RATE_LIMIT_PATH", os.path.join(app.instance_path, "limits.sqlite"))
+app.config["RATE_LIMIT_PER_IP"] = os.environ.get("RATE_LIMIT_PER_IP", "120/3600")
+app.config["RATE_LIMIT_PER_SESSION"] = os.environ.get("RATE_LIMIT_PER_SESSION", "20/3600")
+app.config["RATE_LIMIT_PROXY_COUNT"] = int(os.environ.get("RATE_LIMIT_PROXY_COUNT", 1))
+app.config["UPLOAD_CONCURRENCY_LIMIT"] = int(os.environ.get("UPLOAD_CONCURRENCY_LIMIT", 16))
+
+# Background job deleting uploads that no request (hot or archived) points
+# at any more, once they are older than the grace period
+app.config["UPLOAD_SWEEPER_ENABLED"] = os.environ.get("UPLOAD_SWEEPER_ENABLED", "1") == "1"
+app.config["UPLOAD_SWEEP_INTERVAL"] = int(os.environ.get("UPLOAD_SWEEP_INTERVAL", 3600))
+app.config["UPLOAD_ORPHAN_GRACE_HOURS"] = int(os.environ.get("UPLOAD_ORPHAN_GRACE_HOURS", 24))
+
+# Identical submissions (same email, subject, date and file) within this
+# many minutes are treated as one, even without a matching form key
+app.config["SUBMISSION_DEDUPE_MINUTES"] = int(os.environ.get("SUBMISSION_DEDUPE_MINUTES", 10))
+
+# Processes rendering PDFs for the bulk ZIP export, per gunicorn worker;
+# 0 renders them in the request thread (the only sensible choice on one CPU)
+app.config["EXPORT_WORKERS"] = int(os.environ.get("EXPORT_WORKERS", min(4, (os.cpu_count() or 1) - 1)))
+
+# Requests whose due/test/exam date is older than this many days are moved
+# out of the hot tables into the archive
+app.config["ARCHIVE_RETENTION_DAYS"] = int(os.environ.get("ARCHIVE_RETENTION_DAYS", 30))
+app.config["ARCHIVE_COMPRESS_FILES"] = os.environ.get("ARCHIVE_COMPRESS_FILES", "0") == "1"
+app.config["ARCHIVE_PAGE_SIZE"] = 100
+# Background job archiving them; only one process runs it at a time
+app.config["ARCHIVE_SCHEDULER_ENABLED"] = os.environ.get("ARCHIVE_SCHEDULER_ENABLED", "1") == "1"
+app.config["ARCHIVE_INTERVAL"] = int(os.environ.get("ARCHIVE_INTERVAL", 3600))
+
+# Background job that moves requests between active/warning/urgent/expired
+# as their deadlines cross. Only one process runs it at a time.
+app.config["DEADLINE_SCHEDULER_ENABLED"] = os.environ.get("DEADLINE_SCHEDULER_ENABLED", "1") == "1"
+app.config["DEADLINE_SCHEDULER_INTERVAL"] = int(os.environ.get("DEADLINE_SCHEDULER_INTERVAL", 60))
+app.config["DEADLINE_WARNING_DAYS"] = 3
+app.config["DEADLINE_URGENT_DAYS"] = 1
+
+# WAL, synchronous=NORMAL and a busy timeout on every SQLite connection
+event.listen(Engine, "connect", sqlite_pragmas)
+
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+storage = create_storage(app.config)
+cache = create_cache(app.config)
+limiter = create_limiter(app.config)
+
+UPLOAD_SERVICES = ("assignments", "quizzes", "exams", "payments")
 
 # ======================================================
 # MODELS
@@ -58,11 +167,13 @@ class Assignment(db.Model):
     university = db.Column(db.String(150))
     assignment_type = db.Column(db.String(100))
     subject = db.Column(db.String(150))
-    due_date = db.Column(db.Date)
+    due_date = db.Column(db.Date, index=True)
     details = db.Column(db.Text)
     assignment_file = db.Column(db.String(255))
     proof_of_payment = db.Column(db.String(255))
     status = db.Column(db.String(50), default="Pending Payment")
+    deadline_state = db.Column(db.String(20), index=True)
+    state_changes_on = db.Column(db.Date, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
@@ -74,11 +185,13 @@ class QuizRequest(db.Model):
     university = db.Column(db.String(150))
     subject = db.Column(db.String(150))
     quiz_type = db.Column(db.String(100))
-    test_date = db.Column(db.Date)
+    test_date = db.Column(db.Date, index=True)
     topics = db.Column(db.Text)
     quiz_file = db.Column(db.String(255))
     proof_of_payment = db.Column(db.String(255))
     status = db.Column(db.String(50), default="Pending Payment")
+    deadline_state = db.Column(db.String(20), index=True)
+    state_changes_on = db.Column(db.Date, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
@@ -90,20 +203,128 @@ class ExamRequest(db.Model):
     university = db.Column(db.String(150))
     subject = db.Column(db.String(150))
     exam_type = db.Column(db.String(100))
-    exam_date = db.Column(db.Date)
+    exam_date = db.Column(db.Date, index=True)
     topics = db.Column(db.Text)
     exam_file = db.Column(db.String(255))
     proof_of_payment = db.Column(db.String(255))
     status = db.Column(db.String(50), default="Pending Payment")
+    deadline_state = db.Column(db.String(20), index=True)
+    state_changes_on = db.Column(db.Date, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class ArchivedRequest(db.Model):
+    """Cold copy of an expired Assignment, QuizRequest or ExamRequest."""
+    id = db.Column(db.Integer, primary_key=True)
+    service = db.Column(db.String(20), index=True)
+    original_id = db.Column(db.Integer)
+    name = db.Column(db.String(150))
+    email = db.Column(db.String(150), index=True)
+    contact = db.Column(db.String(50))
+    university = db.Column(db.String(150))
+    subject = db.Column(db.String(150), index=True)
+    request_type = db.Column(db.String(100))
+    deadline = db.Column(db.Date, index=True)
+    details = db.Column(db.Text)
+    request_file = db.Column(db.String(255))
+    proof_of_payment = db.Column(db.String(255))
+    files_compressed = db.Column(db.Boolean, default=False)
+    status = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class SchedulerLock(db.Model):
+    """Lease held by the process currently running a background job."""
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))
+    expires_at = db.Column(db.DateTime)
+
+
+class RequestRollup(db.Model):
+    """
+    Number of requests created on ``day`` for a service and university that
+    are currently in ``status``. Kept up to date by every write path, so
+    analytics never scan the request tables.
+    """
+    day = db.Column(db.Date, primary_key=True)
+    service = db.Column(db.String(20), primary_key=True)
+    university = db.Column(db.String(150), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Submission(db.Model):
+    """
+    One accepted form post, so a repeat of it (double-click, browser retry)
+    can be answered with the original result instead of a second row.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(64), unique=True)
+    fingerprint = db.Column(db.String(64), index=True)
+    endpoint = db.Column(db.String(30))
+    service = db.Column(db.String(20))
+    request_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), unique=True)
     password = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# service -> (model, deadline column, type column, text column, file column)
+SERVICE_MODELS = {
+    "assignments": (Assignment, "due_date", "assignment_type", "details", "assignment_file"),
+    "quizzes": (QuizRequest, "test_date", "quiz_type", "topics", "quiz_file"),
+    "exams": (ExamRequest, "exam_date", "exam_type", "topics", "exam_file"),
+}
+
+# Singular names used in the admin URLs -> service keys above
+SERVICE_NAMES = {"assignment": "assignments", "quiz": "quizzes", "exam": "exams"}
+
+# ======================================================
+# READ MODELS
+# ======================================================
+
+# Listing pages only need a handful of columns and never write back, so they
+# read plain rows instead of full ORM entities. That skips the large
+# details/topics columns, the identity map and flush tracking.
+
+LISTING_COLUMNS = ("id", "name", "email", "contact", "university", "subject",
+                   "status", "deadline_state", "proof_of_payment", "created_at")
+
+
+class ListingRow:
+    __slots__ = ()
+    columns = ()
+
+    def __init__(self, values):
+        for name, value in zip(self.columns, values):
+            setattr(self, name, value)
+
+
+class AssignmentRow(ListingRow):
+    columns = LISTING_COLUMNS + ("due_date", "assignment_file")
+    __slots__ = columns + ("assignment_file_exists", "payment_file_exists")
+
+
+class QuizRow(ListingRow):
+    columns = LISTING_COLUMNS + ("test_date", "quiz_file")
+    __slots__ = columns + ("quiz_file_exists", "payment_file_exists")
+
+
+class ExamRow(ListingRow):
+    columns = LISTING_COLUMNS + ("exam_date", "exam_file")
+    __slots__ = columns + ("exam_file_exists", "payment_file_exists")
+
+
+def load_listing(row_class, model, *order_by):
+    """Read ``row_class.columns`` of every ``model`` row into ``row_class`` objects."""
+    query = db.select(*[getattr(model, name) for name in row_class.columns]).order_by(*order_by)
+    return [row_class(values) for values in db.session.execute(query)]
+
 # ======================================================
 # HELPERS
 # ======================================================
@@ -120,9 +341,209 @@ def admin_login_required(f):
         return f(*args, **kwargs)
     return wrapper
 
+def invalidate_request_caches(service=None, id=None):
+    """
+    Drop cached data derived from the request tables. Called after every
+    commit that changes them; without an id every cached PDF is dropped too.
+    """
+    cache.invalidate("dashboard", "reports", "analytics")
+    if id is None:
+        cache.invalidate("pdf")
+    else:
+        cache.delete("pdf", f"{service}:{id}")
+
+def cacheable():
+    # A lagging replica can serve data from before the latest invalidation;
+    # caching that would keep it stale for the whole TTL on every worker
+    return not reads_from_replica(db)
+
+def cached_response(namespace, key):
+    """
+    Cache a view's successful response body and headers. ``key`` is formatted
+    with the view arguments, e.g. "assignments:{id}".
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(**kwargs):
+            cache_key = key.format(**kwargs)
+            generation = cache.generation(namespace)
+            cached = cache.get(namespace, cache_key, generation)
+            if cached is not None:
+                body, headers = cached
+                response = make_response(body)
+                response.headers.update(headers)
+                return response
+
+            response = make_response(f(**kwargs))
+            if response.status_code == 200 and cacheable():
+                headers = {name: response.headers[name]
+                           for name in ("Content-Type", "Content-Disposition") if name in response.headers}
+                cache.set(namespace, cache_key, (response.get_data(), headers), generation=generation)
+            return response
+        return wrapper
+    return decorator
+
 def ensure_dirs():
-    for d in ["assignments", "quizzes", "exams", "payments"]:
-        os.makedirs(f"static/uploads/{d}", exist_ok=True)
+    if app.config["STORAGE_BACKEND"] != "local":
+        return
+    for d in UPLOAD_SERVICES:
+        os.makedirs(os.path.join(app.config["UPLOAD_FOLDER"], d), exist_ok=True)
+
+def save_upload(service, file):
+    """
+    Store an uploaded file for ``service`` and return its stored filename.
+
+    Browsers that uploaded straight to storage through a presigned URL send
+    the resulting name in ``uploaded_file`` instead of the file itself. Only
+    names presign_upload handed to this session are accepted, once each, so
+    a post can't attach itself to somebody else's stored file.
+    """
+    if file and file.filename and allowed_file(file.filename):
+        # Random prefix, as for direct uploads: students reuse names like
+        # "assignment.pdf", and overwriting would repoint older requests
+        filename = f"{secrets.token_hex(8)}_{secure_filename(file.filename)}"
+        storage.save(service, filename, file.stream)
+        return filename
+
+    uploaded = issued_upload(service)
+    if uploaded and storage.exists(service, uploaded):
+        issued = session["presigned_uploads"]
+        issued.remove(f"{service}/{uploaded}")
+        session["presigned_uploads"] = issued
+        return uploaded
+
+    return None
+
+def issued_upload(service):
+    """The form's ``uploaded_file``, if presign_upload issued it to this session."""
+    uploaded = secure_filename(request.form.get("uploaded_file", ""))
+    if uploaded and f"{service}/{uploaded}" in session.get("presigned_uploads", []):
+        return uploaded
+    return None
+
+def send_upload(service, filename):
+    url = storage.download_url(service, filename, app.config["PRESIGNED_URL_EXPIRY"])
+    if url:
+        return redirect(url)
+    return send_from_directory(storage.folder(service), filename, as_attachment=True)
+
+@app.template_global()
+def new_idempotency_key():
+    # Rendered into each form; a resubmission of the same page repeats it
+    return secrets.token_urlsafe(24)
+
+def upload_digest(file):
+    """sha256 of an uploaded file's content, leaving its stream rewound."""
+    if not (file and file.filename):
+        return None
+    digest = hashlib.sha256()
+    while chunk := file.stream.read(64 * 1024):
+        digest.update(chunk)
+    file.stream.seek(0)
+    return digest.hexdigest()
+
+def upload_fingerprint(service, file):
+    """
+    Content digest of the posted file or, for a direct upload, of the object
+    it names. Every presign hands out a new random name, so a double-click
+    that uploads twice must be recognised by content, not by name.
+    """
+    digest = upload_digest(file)
+    if digest is None and (uploaded := issued_upload(service)):
+        digest = storage.digest(service, uploaded)
+    return digest
+
+def submission_fingerprint(*parts):
+    normalized = "\x1f".join(str(part or "").strip().lower() for part in parts)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+def find_submission(endpoint, fingerprint):
+    """
+    The earlier submission this post repeats: the one with the same form
+    key and content, or else the same content within the dedupe window.
+    A key resent with different content (the form was edited after going
+    back) is a new submission.
+    """
+    since = datetime.utcnow() - timedelta(minutes=app.config["SUBMISSION_DEDUPE_MINUTES"])
+    repeated = Submission.created_at >= since
+    order = [Submission.id.desc()]
+    key = request.form.get("idempotency_key")
+    if key:
+        # One query for both; a key match wins over a window match
+        same_key = Submission.idempotency_key == key
+        repeated = or_(same_key, repeated)
+        order.insert(0, same_key.desc())
+    return Submission.query.filter(
+        Submission.endpoint == endpoint,
+        Submission.fingerprint == fingerprint,
+        repeated,
+    ).order_by(*order).first()
+
+def record_submission(endpoint, service, request_id, fingerprint):
+    """Add the Submission for this post to the current transaction."""
+    key = request.form.get("idempotency_key") or None
+    if key:
+        taken = Submission.query.filter_by(idempotency_key=key).first()
+        if taken is not None and (taken.endpoint, taken.fingerprint) != (endpoint, fingerprint):
+            key = None  # reused key with new content, see find_submission
+    db.session.add(Submission(idempotency_key=key, fingerprint=fingerprint, endpoint=endpoint,
+                              service=service, request_id=request_id))
+
+def commit_submission(endpoint, fingerprint):
+    """
+    Commit the current transaction. If a concurrent post with the same key
+    committed first, roll back and return the replay of that one instead.
+    """
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        previous = find_submission(endpoint, fingerprint)
+        if previous is None:
+            raise
+        return replay_submission(previous)
+    return None
+
+# service -> (session key holding the request id, service_type shown on the payment page)
+SUBMISSION_SESSION_KEYS = {
+    "assignments": ("assignment_id", "Assignment Assistance"),
+    "quizzes": ("quiz_id", "Quiz Assistance"),
+    "exams": ("exam_id", "Exam Assistance"),
+}
+
+def replay_submission(previous):
+    """Answer a repeated post the way the original one was answered."""
+    if previous.endpoint == "upload_proof":
+        flash("Payment proof uploaded successfully!", "success")
+        return redirect(url_for("queue_tracking"))
+
+    id_key, service_type = SUBMISSION_SESSION_KEYS[previous.service]
+    session[id_key] = previous.request_id
+    session["service_type"] = service_type
+    session.setdefault("request_time", datetime.now().isoformat())
+    flash("We already received this request. Please proceed to payment.", "info")
+    return redirect(url_for("payment"))
+
+def ensure_columns():
+    # create_all() never alters existing tables, so columns declared after a
+    # table was first created are added here
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(db.text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def ensure_indexes():
+    # create_all() skips tables that already exist, so indexes declared after
+    # a table was first created have to be added separately
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
 
 # Add datetime filter to Jinja2
 @app.template_filter('datetime')
@@ -147,14 +568,6 @@ def format_date(value, format='%Y-%m-%d'):
             return value
     return value.strftime(format)
 
-@app.template_filter('is_expired')
-def is_expired(due_date):
-    if not due_date:
-        return True
-    if isinstance(due_date, str):
-        due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-    return due_date < date.today()
-
 # Create default admin user
 def create_default_admin():
     admin_exists = Admin.query.filter_by(username="admin").first()
@@ -174,110 +587,52 @@ def home():
 
 @app.route('/download/<service>/<filename>')
 def download_file(service, filename):
-    folder_map = {
-        "assignments": "static/uploads/assignments",
-        "quizzes": "static/uploads/quizzes",
-        "exams": "static/uploads/exams",
-        "payments": "static/uploads/payments"
-    }
-    
-    folder = folder_map.get(service)
-    if not folder:
+    if service not in UPLOAD_SERVICES:
         abort(404)
     
-    # Ensure the directory exists
-    if not os.path.exists(folder):
-        os.makedirs(folder, exist_ok=True)
+    filename = secure_filename(filename)
+    if not filename:
         abort(404)
     
-    try:
-        filename = secure_filename(filename)
-        return send_from_directory(folder, filename, as_attachment=True)
-    except FileNotFoundError:
+    return send_upload(service, filename)
+
+# Presigned upload names remembered per session (they live in the cookie)
+PRESIGNED_UPLOADS_KEPT = 8
+
+@app.route("/uploads/presign", methods=["POST"])
+def presign_upload():
+    """
+    Hand the browser a presigned POST so it can upload straight to storage.
+    Returns 404 when the backend serves files itself (local disk).
+    """
+    data = request.get_json(silent=True) or request.form
+    service = data.get("service")
+    original = secure_filename(data.get("filename", ""))
+
+    if service not in UPLOAD_SERVICES or not original or not allowed_file(original):
+        abort(400)
+
+    # Random prefix so direct uploads can never overwrite each other
+    filename = f"{secrets.token_hex(8)}_{original}"
+    presigned = storage.presigned_upload(service, filename, app.config["MAX_CONTENT_LENGTH"],
+                                         app.config["PRESIGNED_URL_EXPIRY"])
+    if presigned is None:
         abort(404)
 
+    # Remember the name for save_upload; the newest few are enough for a form
+    issued = session.get("presigned_uploads", [])
+    session["presigned_uploads"] = (issued + [f"{service}/{filename}"])[-PRESIGNED_UPLOADS_KEPT:]
+
+    return jsonify(filename=filename, url=presigned["url"], fields=presigned["fields"])
+
 @app.route("/download-pdf/assignment/<int:id>")
 @admin_login_required
+@read_replica
+@cached_response("pdf", "assignments:{id}")
 def download_assignment_pdf(id):
     assignment = Assignment.query.get_or_404(id)
     
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        spaceAfter=6,
-        spaceBefore=12
-    )
-    
-    normal_style = styles["Normal"]
-    
-    # Title
-    elements.append(Paragraph("Assignment Details", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Student Information
-    elements.append(Paragraph("Student Information", heading_style))
-    student_data = [
-        ["Name:", assignment.name],
-        ["Email:", assignment.email],
-        ["Contact:", assignment.contact],
-        ["University:", assignment.university]
-    ]
-    
-    student_table = Table(student_data, colWidths=[1.5*inch, 4*inch])
-    student_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(student_table)
-    elements.append(Spacer(1, 20))
-    
-    # Assignment Details
-    elements.append(Paragraph("Assignment Details", heading_style))
-    assignment_data = [
-        ["Assignment Type:", assignment.assignment_type],
-        ["Subject:", assignment.subject],
-        ["Due Date:", assignment.due_date.strftime('%Y-%m-%d')],
-        ["Status:", assignment.status],
-        ["Created:", assignment.created_at.strftime('%Y-%m-%d %H:%M:%S')]
-    ]
-    
-    assignment_table = Table(assignment_data, colWidths=[1.5*inch, 4*inch])
-    assignment_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(assignment_table)
-    elements.append(Spacer(1, 20))
-    
-    # Assignment Description
-    elements.append(Paragraph("Assignment Description", heading_style))
-    elements.append(Paragraph(assignment.details, normal_style))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    buffer.seek(0)
-    
-    # Create response
-    response = make_response(buffer.getvalue())
+    response = make_response(render_request_pdf("assignments", assignment))
     response.headers['Content-Type'] = 'application/pdf'
     response.headers['Content-Disposition'] = f'attachment; filename=assignment_{id}_details.pdf'
     
@@ -285,81 +640,12 @@ def download_assignment_pdf(id):
 
 @app.route("/download-pdf/quiz/<int:id>")
 @admin_login_required
+@read_replica
+@cached_response("pdf", "quizzes:{id}")
 def download_quiz_pdf(id):
     quiz = QuizRequest.query.get_or_404(id)
     
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        spaceAfter=6,
-        spaceBefore=12
-    )
-    
-    normal_style = styles["Normal"]
-    
-    # Title
-    elements.append(Paragraph("Quiz Request Details", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Student Information
-    elements.append(Paragraph("Student Information", heading_style))
-    student_data = [
-        ["Name:", quiz.name],
-        ["Email:", quiz.email],
-        ["Contact:", quiz.contact],
-        ["University:", quiz.university or "Not specified"]
-    ]
-    
-    student_table = Table(student_data, colWidths=[1.5*inch, 4*inch])
-    student_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(student_table)
-    elements.append(Spacer(1, 20))
-    
-    # Quiz Details
-    elements.append(Paragraph("Quiz Details", heading_style))
-    quiz_data = [
-        ["Quiz Type:", quiz.quiz_type],
-        ["Subject:", quiz.subject],
-        ["Test Date:", quiz.test_date.strftime('%Y-%m-%d')],
-        ["Status:", quiz.status],
-        ["Created:", quiz.created_at.strftime('%Y-%m-%d %H:%M:%S')]
-    ]
-    
-    quiz_table = Table(quiz_data, colWidths=[1.5*inch, 4*inch])
-    quiz_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(quiz_table)
-    elements.append(Spacer(1, 20))
-    
-    # Topics
-    if quiz.topics:
-        elements.append(Paragraph("Topics to Cover", heading_style))
-        elements.append(Paragraph(quiz.topics, normal_style))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    response = make_response(buffer.getvalue())
+    response = make_response(render_request_pdf("quizzes", quiz))
     response.headers['Content-Type'] = 'application/pdf'
     response.headers['Content-Disposition'] = f'attachment; filename=quiz_{id}_details.pdf'
     
@@ -367,81 +653,12 @@ def download_quiz_pdf(id):
 
 @app.route("/download-pdf/exam/<int:id>")
 @admin_login_required
+@read_replica
+@cached_response("pdf", "exams:{id}")
 def download_exam_pdf(id):
     exam = ExamRequest.query.get_or_404(id)
     
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        spaceAfter=6,
-        spaceBefore=12
-    )
-    
-    normal_style = styles["Normal"]
-    
-    # Title
-    elements.append(Paragraph("Exam Request Details", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Student Information
-    elements.append(Paragraph("Student Information", heading_style))
-    student_data = [
-        ["Name:", exam.name],
-        ["Email:", exam.email],
-        ["Contact:", exam.contact],
-        ["University:", exam.university]
-    ]
-    
-    student_table = Table(student_data, colWidths=[1.5*inch, 4*inch])
-    student_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(student_table)
-    elements.append(Spacer(1, 20))
-    
-    # Exam Details
-    elements.append(Paragraph("Exam Details", heading_style))
-    exam_data = [
-        ["Exam Type:", exam.exam_type],
-        ["Subject:", exam.subject],
-        ["Exam Date:", exam.exam_date.strftime('%Y-%m-%d')],
-        ["Status:", exam.status],
-        ["Created:", exam.created_at.strftime('%Y-%m-%d %H:%M:%S')]
-    ]
-    
-    exam_table = Table(exam_data, colWidths=[1.5*inch, 4*inch])
-    exam_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(exam_table)
-    elements.append(Spacer(1, 20))
-    
-    # Topics
-    if exam.topics:
-        elements.append(Paragraph("Topics to Cover", heading_style))
-        elements.append(Paragraph(exam.topics, normal_style))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    response = make_response(buffer.getvalue())
+    response = make_response(render_request_pdf("exams", exam))
     response.headers['Content-Type'] = 'application/pdf'
     response.headers['Content-Disposition'] = f'attachment; filename=exam_{id}_details.pdf'
     
@@ -449,115 +666,999 @@ def download_exam_pdf(id):
 
 @app.route("/download-all-pdf/<service_type>")
 @admin_login_required
+@read_replica
+@cached_response("reports", "{service_type}")
 def download_all_pdf(service_type):
     if service_type == "assignments":
-        items = Assignment.query.order_by(Assignment.due_date.desc()).all()
-        title = "All Assignments Report"
-        filename = "all_assignments_report.pdf"
+        items = load_listing(AssignmentRow, Assignment, Assignment.due_date.desc())
     elif service_type == "quizzes":
-        items = QuizRequest.query.order_by(QuizRequest.test_date.desc()).all()
-        title = "All Quizzes Report"
-        filename = "all_quizzes_report.pdf"
+        items = load_listing(QuizRow, QuizRequest, QuizRequest.test_date.desc())
     elif service_type == "exams":
-        items = ExamRequest.query.order_by(ExamRequest.exam_date.desc()).all()
-        title = "All Exams Report"
-        filename = "all_exams_report.pdf"
+        items = load_listing(ExamRow, ExamRequest, ExamRequest.exam_date.desc())
     else:
         abort(404)
     
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=0.5*inch, rightMargin=0.5*inch)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=14,
-        alignment=1,  # Center alignment
-        spaceAfter=20
-    )
+    response = make_response(render_listing_pdf(service_type, items))
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f'attachment; filename={LISTING_LAYOUTS[service_type].filename}'
     
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=10,
-        spaceAfter=6,
-        spaceBefore=12
+    return response
+
+# ======================================================
+# DEADLINES
+# ======================================================
+
+def deadline_state_for(deadline, today=None):
+    """
+    Return ``(state, state_changes_on)`` for a deadline. ``state_changes_on`` is
+    the first day the state will be different, or None once it is expired.
+    """
+    today = today or date.today()
+    warning_days = app.config["DEADLINE_WARNING_DAYS"]
+    urgent_days = app.config["DEADLINE_URGENT_DAYS"]
+
+    if deadline is None:
+        return "expired", None
+
+    days_left = (deadline - today).days
+    if days_left < 0:
+        return "expired", None
+    if days_left <= urgent_days:
+        return "urgent", deadline + timedelta(days=1)
+    if days_left <= warning_days:
+        return "warning", deadline - timedelta(days=urgent_days)
+    return "active", deadline - timedelta(days=warning_days)
+
+
+def apply_deadline_state(item, deadline, today=None):
+    item.deadline_state, item.state_changes_on = deadline_state_for(deadline, today)
+    if item.deadline_state == "expired" and item.status in (None, "Pending Payment"):
+        item.status = "Expired"
+
+
+def expire_unpaid(model, ids):
+    """
+    Flip the requests among ``ids`` that are still unpaid to "Expired" and
+    return ``{id: status it replaced}`` for the rows actually changed. The
+    status is checked by the UPDATE itself, so a payment or admin change
+    committed since the rows were read is left alone.
+    """
+    expired = {}
+    for old_status in (None, "Pending Payment"):
+        unpaid = model.status.is_(None) if old_status is None else model.status == old_status
+        if db.engine.dialect.update_returning:
+            result = db.session.execute(
+                update(model).where(model.id.in_(ids), unpaid).values(status="Expired").returning(model.id)
+            )
+            expired.update((row_id, old_status) for (row_id,) in result)
+            continue
+        for row_id in ids:
+            if row_id in expired:
+                continue
+            result = db.session.execute(update(model).where(model.id == row_id, unpaid).values(status="Expired"))
+            if result.rowcount:
+                expired[row_id] = old_status
+    return expired
+
+
+def run_deadline_transitions(today=None, batch_size=1000):
+    """
+    Update the stored deadline state of every request whose state is due to
+    change. Only rows with ``state_changes_on <= today`` (or no state yet) are
+    read, so a run costs as much as the number of transitions, not the table.
+    Every write re-checks its condition, so overlapping runs (or a run racing
+    an admin) change each row and its rollups once.
+    """
+    today = today or date.today()
+    changed = {}
+
+    for service, (model, date_field, *_) in SERVICE_MODELS.items():
+        deadline = getattr(model, date_field)
+        due = or_(model.deadline_state.is_(None), model.state_changes_on <= today)
+        changed[service] = 0
+        last_id = 0
+
+        while True:
+            rows = db.session.query(
+                model.id, deadline, model.created_at, model.university
+            ).filter(due, model.id > last_id).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            states = {}
+            for row_id, row_deadline, created_at, university in rows:
+                states.setdefault(deadline_state_for(row_deadline, today), []).append(row_id)
+
+            for (state, changes_on), ids in states.items():
+                result = db.session.execute(
+                    update(model).where(model.id.in_(ids), due)
+                    .values(deadline_state=state, state_changes_on=changes_on)
+                    .execution_options(synchronize_session=False)
+                )
+                changed[service] += result.rowcount
+
+            expired_ids = states.get(("expired", None), [])
+            expired = expire_unpaid(model, expired_ids) if expired_ids else {}
+
+            rollups = {}
+            for row_id, _, created_at, university in rows:
+                if row_id in expired:
+                    for key, delta in ((rollup_key(service, created_at, university, expired[row_id]), -1),
+                                       (rollup_key(service, created_at, university, "Expired"), 1)):
+                        rollups[key] = rollups.get(key, 0) + delta
+
+            update_rollups(rollups)
+            db.session.commit()
+
+    if any(changed.values()):
+        invalidate_request_caches()
+
+    return changed
+
+
+def acquire_scheduler_lock(name, owner, ttl):
+    """Take or renew the named lease. Returns True if ``owner`` now holds it."""
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(SchedulerLock)
+        .where(SchedulerLock.name == name)
+        .where(or_(SchedulerLock.owner == owner, SchedulerLock.expires_at < now))
+        .values(owner=owner, expires_at=now + ttl)
     )
-    
-    # Title
-    elements.append(Paragraph(title, title_style))
-    elements.append(Spacer(1, 10))
-    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Create table data
-    if service_type == "assignments":
-        table_data = [["ID", "Name", "Subject", "Due Date", "Status", "Created"]]
-        for item in items:
-            table_data.append([
-                str(item.id),
-                item.name[:20] + "..." if len(item.name) > 20 else item.name,
-                item.subject[:15] + "..." if len(item.subject) > 15 else item.subject,
-                item.due_date.strftime('%Y-%m-%d'),
-                item.status,
-                item.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-    else:
-        table_data = [["ID", "Name", "Subject", "Date", "Status", "Created"]]
-        date_field = "test_date" if service_type == "quizzes" else "exam_date"
-        for item in items:
-            table_data.append([
-                str(item.id),
-                item.name[:20] + "..." if len(item.name) > 20 else item.name,
-                item.subject[:15] + "..." if len(item.subject) > 15 else item.subject,
-                getattr(item, date_field).strftime('%Y-%m-%d'),
-                item.status,
-                item.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-    
-    # Create table
-    table = Table(table_data, colWidths=[0.5*inch, 1.5*inch, 1.5*inch, 1*inch, 1.2*inch, 1*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 20))
-    
-    # Summary
-    status_count = {}
+    db.session.commit()
+    if result.rowcount:
+        return True
+
+    if db.session.get(SchedulerLock, name) is not None:
+        return False
+
+    try:
+        db.session.add(SchedulerLock(name=name, owner=owner, expires_at=now + ttl))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def release_scheduler_lock(name, owner):
+    """Give up the named lease so another process can take it straight away."""
+    SchedulerLock.query.filter_by(name=name, owner=owner).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def run_leased(name, job, interval, stop_event, wait=None):
+    """
+    Run ``job`` every ``interval`` seconds in whichever process holds the
+    ``name`` lease, until ``stop_event`` is set; then release the lease so
+    the remaining processes don't wait for it to expire. ``wait`` can
+    shorten the sleep between runs.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    while not stop_event.is_set():
+        try:
+            with app.app_context():
+                if acquire_scheduler_lock(name, owner, timedelta(seconds=interval * 3)):
+                    job()
+        except Exception:
+            app.logger.exception("%s run failed", name)
+
+        stop_event.wait(wait() if wait else interval)
+
+    try:
+        with app.app_context():
+            release_scheduler_lock(name, owner)
+    except Exception:
+        app.logger.exception("Could not release the %s lease; it expires on its own", name)
+
+
+def _seconds_until_midnight():
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+def deadline_scheduler_loop(stop_event):
+    interval = app.config["DEADLINE_SCHEDULER_INTERVAL"]
+    # Wake up right after midnight so states flip as soon as the date does
+    run_leased("deadline-scheduler", run_deadline_transitions, interval, stop_event,
+               wait=lambda: min(interval, _seconds_until_midnight() + 1))
+
+
+deadline_scheduler_stop = threading.Event()
+
+def start_deadline_scheduler():
+    thread = threading.Thread(target=deadline_scheduler_loop, args=(deadline_scheduler_stop,),
+                              name="deadline-scheduler", daemon=True)
+    thread.start()
+    return thread
+
+
+@app.cli.command("run-deadlines")
+def run_deadlines_command():
+    """Apply pending deadline transitions once."""
+    changed = run_deadline_transitions()
+    for service, count in changed.items():
+        click.echo(f"{service}: {count} updated")
+
+# ======================================================
+# ARCHIVE
+# ======================================================
+
+def _compress_upload(service, filename):
+    if not storage.exists(service, filename):
+        return False
+    with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024) as buffer:
+        with storage.open(service, filename) as src, gzip.GzipFile(fileobj=buffer, mode="wb") as dst:
+            shutil.copyfileobj(src, dst)
+        buffer.seek(0)
+        storage.save(service, filename + ".gz", buffer)
+    return True
+
+
+def compress_archived_files(rows):
+    """
+    Gzip the uploads of freshly archived rows and return the ``(service,
+    filename)`` pairs actually compressed. The original file is only
+    removed once no hot row still points at the same filename.
+    """
+    wanted = {}
+    for row in rows:
+        if row["request_file"]:
+            wanted.setdefault(row["service"], set()).add(row["request_file"])
+        if row["proof_of_payment"]:
+            wanted.setdefault("payments", set()).add(row["proof_of_payment"])
+
+    compressed = set()
+    for service, filenames in wanted.items():
+        if service == "payments":
+            still_used = set()
+            for model, *_ in SERVICE_MODELS.values():
+                still_used.update(
+                    name for (name,) in db.session.query(model.proof_of_payment)
+                    .filter(model.proof_of_payment.in_(filenames))
+                )
+        else:
+            model, _, _, _, file_field = SERVICE_MODELS[service]
+            column = getattr(model, file_field)
+            still_used = {name for (name,) in db.session.query(column).filter(column.in_(filenames))}
+
+        for filename in filenames:
+            if _compress_upload(service, filename):
+                compressed.add((service, filename))
+                if filename not in still_used:
+                    storage.delete(service, filename)
+
+    return compressed
+
+
+def _files_compressed(row, compressed):
+    files = [(row["service"], row["request_file"]), ("payments", row["proof_of_payment"])]
+    files = [pair for pair in files if pair[1]]
+    return bool(files) and all(pair in compressed for pair in files)
+
+
+def delete_unchanged(model, items):
+    """
+    Delete the rows of ``items`` whose status and proof of payment are still
+    the values read into ``items`` and return the ids actually deleted. Like
+    expire_unpaid, the check is part of the DELETE, so a status change or
+    proof upload committed since the read keeps its row.
+    """
+    groups = {}
     for item in items:
-        status_count[item.status] = status_count.get(item.status, 0) + 1
-    
-    elements.append(Paragraph("Summary", heading_style))
-    for status, count in status_count.items():
-        elements.append(Paragraph(f"{status}: {count} requests", styles['Normal']))
-    
-    elements.append(Spacer(1, 10))
-    elements.append(Paragraph(f"Total Requests: {len(items)}", styles['Normal']))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
+        groups.setdefault((item.status, item.proof_of_payment), []).append(item.id)
+
+    deleted = set()
+    for (status, proof), ids in groups.items():
+        unchanged = (model.status.is_not_distinct_from(status),
+                     model.proof_of_payment.is_not_distinct_from(proof))
+        if db.engine.dialect.delete_returning:
+            result = db.session.execute(
+                delete(model).where(model.id.in_(ids), *unchanged).returning(model.id),
+                execution_options={"synchronize_session": False},
+            )
+            deleted.update(row_id for (row_id,) in result)
+            continue
+        for row_id in ids:
+            result = db.session.execute(delete(model).where(model.id == row_id, *unchanged),
+                                        execution_options={"synchronize_session": False})
+            if result.rowcount:
+                deleted.add(row_id)
+    return deleted
+
+
+def archive_expired_requests(retention_days=None, compress_files=None, batch_size=500):
+    """
+    Move requests whose deadline passed more than ``retention_days`` ago into
+    ArchivedRequest, in batches, and return how many rows moved per service.
+    """
+    if retention_days is None:
+        retention_days = app.config["ARCHIVE_RETENTION_DAYS"]
+    if compress_files is None:
+        compress_files = app.config["ARCHIVE_COMPRESS_FILES"]
+
+    cutoff = date.today() - timedelta(days=retention_days)
+    moved = {}
+
+    for service, (model, date_field, type_field, text_field, file_field) in SERVICE_MODELS.items():
+        deadline = getattr(model, date_field)
+        moved[service] = 0
+
+        while True:
+            # FOR UPDATE keeps writers off the batch on Postgres; the delete
+            # below re-checks the values read either way (SQLite)
+            items = (model.query.filter(deadline < cutoff).order_by(model.id)
+                     .limit(batch_size).with_for_update().all())
+            if not items:
+                break
+
+            archived_at = datetime.utcnow()
+            rows = [{
+                "service": service,
+                "original_id": item.id,
+                "name": item.name,
+                "email": item.email,
+                "contact": item.contact,
+                "university": item.university,
+                "subject": item.subject,
+                "request_type": getattr(item, type_field),
+                "deadline": getattr(item, date_field),
+                "details": getattr(item, text_field),
+                "request_file": getattr(item, file_field),
+                "proof_of_payment": item.proof_of_payment,
+                "files_compressed": False,
+                "status": item.status,
+                "created_at": item.created_at,
+                "archived_at": archived_at,
+            } for item in items]
+
+            # Rows changed since they were read stay put and are re-read by
+            # the next batch, so the archive never keeps a stale copy
+            deleted = delete_unchanged(model, items)
+            rows = [row for row in rows if row["original_id"] in deleted]
+            if rows:
+                db.session.execute(ArchivedRequest.__table__.insert(), rows)
+            db.session.commit()
+
+            if compress_files:
+                # Flag only the rows whose every upload really was gzipped
+                compressed = compress_archived_files(rows)
+                ids = [row["original_id"] for row in rows if _files_compressed(row, compressed)]
+                if ids:
+                    ArchivedRequest.query.filter(
+                        ArchivedRequest.service == service,
+                        ArchivedRequest.archived_at == archived_at,
+                        ArchivedRequest.original_id.in_(ids),
+                    ).update({"files_compressed": True}, synchronize_session=False)
+                    db.session.commit()
+
+            moved[service] += len(rows)
+
+    if any(moved.values()):
+        invalidate_request_caches()
+
+    return moved
+
+
+def _parse_date_arg(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def archive_search_query(args):
+    query = ArchivedRequest.query
+
+    service = args.get("service")
+    if service in SERVICE_MODELS:
+        query = query.filter(ArchivedRequest.service == service)
+
+    term = (args.get("q") or "").strip()
+    if term:
+        like = f"%{term}%"
+        query = query.filter(db.or_(
+            ArchivedRequest.name.ilike(like),
+            ArchivedRequest.email.ilike(like),
+            ArchivedRequest.subject.ilike(like),
+        ))
+
+    date_from = _parse_date_arg(args.get("from"))
+    if date_from:
+        query = query.filter(ArchivedRequest.deadline >= date_from)
+
+    date_to = _parse_date_arg(args.get("to"))
+    if date_to:
+        query = query.filter(ArchivedRequest.deadline <= date_to)
+
+    return query.order_by(ArchivedRequest.deadline.desc(), ArchivedRequest.id.desc())
+
+
+@app.route("/archive")
+@admin_login_required
+@read_replica
+def archive():
+    page = max(request.args.get("page", 1, type=int), 1)
+    page_size = app.config["ARCHIVE_PAGE_SIZE"]
+    filters = {key: value for key, value in request.args.items() if key != "page" and value}
+    query = archive_search_query(filters)
+
+    items = query.offset((page - 1) * page_size).limit(page_size + 1).all()
+    has_next = len(items) > page_size
+
+    return render_template("archive.html",
+                           items=items[:page_size],
+                           page=page,
+                           has_next=has_next,
+                           filters=filters)
+
+
+@app.route("/archive/export")
+@admin_login_required
+@read_replica
+def archive_export():
+    query = archive_search_query(request.args)
+    columns = ["service", "original_id", "name", "email", "contact", "university", "subject",
+               "request_type", "deadline", "status", "request_file", "proof_of_payment",
+               "created_at", "archived_at", "details"]
+
+    def generate():
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for item in query.yield_per(1000):
+            writer.writerow([getattr(item, column) for column in columns])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(generate()), mimetype="text/csv")
+    response.headers['Content-Disposition'] = 'attachment; filename=archived_requests.csv'
+    return response
+
+
+@app.route("/archive/download/<int:id>/<kind>")
+@admin_login_required
+def archive_download(id, kind):
+    item = ArchivedRequest.query.get_or_404(id)
+
+    if kind == "file":
+        service, filename = item.service, item.request_file
+    elif kind == "proof":
+        service, filename = "payments", item.proof_of_payment
+    else:
+        abort(404)
+
+    if not filename:
+        abort(404)
+
+    if storage.exists(service, filename):
+        return send_upload(service, filename)
+
+    if not storage.exists(service, filename + ".gz"):
+        abort(404)
+
+    def generate():
+        with storage.open(service, filename + ".gz") as raw, gzip.GzipFile(fileobj=raw, mode="rb") as fh:
+            while chunk := fh.read(64 * 1024):
+                yield chunk
+
+    response = Response(generate(), mimetype="application/octet-stream")
     response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-    
     return response
 
+
+def archive_scheduler_loop(stop_event):
+    run_leased("archiver", archive_expired_requests, app.config["ARCHIVE_INTERVAL"], stop_event)
+
+
+archive_scheduler_stop = threading.Event()
+
+def start_archive_scheduler():
+    thread = threading.Thread(target=archive_scheduler_loop, args=(archive_scheduler_stop,),
+                              name="archiver", daemon=True)
+    thread.start()
+    return thread
+
+
+@app.route("/archive/run", methods=["POST"])
+@admin_login_required
+def archive_run():
+    moved = archive_expired_requests()
+    flash(f"Archived {sum(moved.values())} expired request(s).", "success")
+    return redirect(url_for("archive"))
+
+
+@app.cli.command("archive-expired")
+@click.option("--retention-days", type=int, default=None, help="Days past the deadline before archiving.")
+@click.option("--compress/--no-compress", default=None, help="Gzip the uploads of archived requests.")
+def archive_expired_command(retention_days, compress):
+    """Move expired requests into the archive table."""
+    moved = archive_expired_requests(retention_days, compress)
+    for service, count in moved.items():
+        click.echo(f"{service}: {count} archived")
+
+# ======================================================
+# UPLOAD SWEEPER
+# ======================================================
+
+# Upper bounds (in days) of the age buckets in the storage report
+UPLOAD_AGE_BUCKETS = ((1, "<1d"), (7, "1-7d"), (30, "7-30d"), (90, "30-90d"), (None, ">90d"))
+
+def referenced_uploads():
+    """
+    Every stored filename a hot or archived row still points at, per upload
+    folder, read as one DISTINCT query per column rather than per file.
+    """
+    def names(column, *criteria):
+        query = db.session.query(column).filter(column.isnot(None), *criteria).distinct()
+        return {name for (name,) in query}
+
+    referenced = {service: set() for service in UPLOAD_SERVICES}
+    for service, (model, _, _, _, file_field) in SERVICE_MODELS.items():
+        referenced[service] |= names(getattr(model, file_field))
+        referenced["payments"] |= names(model.proof_of_payment)
+
+    # Archived uploads may have been gzipped in place (see compress_archived_files)
+    for service in SERVICE_MODELS:
+        archived = names(ArchivedRequest.request_file, ArchivedRequest.service == service)
+        referenced[service] |= archived | {name + ".gz" for name in archived}
+    archived = names(ArchivedRequest.proof_of_payment)
+    referenced["payments"] |= archived | {name + ".gz" for name in archived}
+
+    return referenced
+
+
+def _age_bucket(age_days):
+    for limit, label in UPLOAD_AGE_BUCKETS:
+        if limit is None or age_days < limit:
+            return label
+
+
+def sweep_uploads(grace_hours=None, dry_run=False):
+    """
+    Reconcile storage against the database. Files no row references and
+    not modified for ``grace_hours`` are deleted (direct uploads land in
+    storage before their form is submitted, hence the grace period).
+    Returns disk usage per service, split by referenced/orphaned and age.
+    """
+    if grace_hours is None:
+        grace_hours = app.config["UPLOAD_ORPHAN_GRACE_HOURS"]
+
+    # List storage before reading references: a file uploaded and committed
+    # in between is then either absent from the listing or referenced
+    listing = {service: storage.inventory(service) for service in UPLOAD_SERVICES}
+    referenced = referenced_uploads()
+    now = datetime.now().timestamp()
+    grace_cutoff = now - grace_hours * 3600
+
+    def usage():
+        return {"files": 0, "bytes": 0}
+
+    report = {"grace_hours": grace_hours, "dry_run": dry_run, "services": {}}
+    totals = {"files": 0, "bytes": 0, "orphaned": usage(), "reclaimed": usage()}
+
+    for service, files in listing.items():
+        summary = {
+            "files": len(files),
+            "bytes": sum(size for size, _ in files.values()),
+            "referenced": usage(),
+            "orphaned": usage(),
+            "reclaimed": usage(),
+            "ages": {label: usage() for _, label in UPLOAD_AGE_BUCKETS},
+        }
+        orphans = files.keys() - referenced[service]
+
+        for filename, (size, modified) in files.items():
+            bucket = summary["ages"][_age_bucket((now - modified) / 86400)]
+            bucket["files"] += 1
+            bucket["bytes"] += size
+
+            kind = "orphaned" if filename in orphans else "referenced"
+            summary[kind]["files"] += 1
+            summary[kind]["bytes"] += size
+
+            if kind == "orphaned" and modified < grace_cutoff:
+                if not dry_run:
+                    storage.delete(service, filename)
+                summary["reclaimed"]["files"] += 1
+                summary["reclaimed"]["bytes"] += size
+
+        report["services"][service] = summary
+        totals["files"] += summary["files"]
+        totals["bytes"] += summary["bytes"]
+        for kind in ("orphaned", "reclaimed"):
+            for key in ("files", "bytes"):
+                totals[kind][key] += summary[kind][key]
+
+    report["totals"] = totals
+    if totals["reclaimed"]["files"] and not dry_run:
+        app.logger.info("Upload sweeper reclaimed %d file(s), %d bytes",
+                        totals["reclaimed"]["files"], totals["reclaimed"]["bytes"])
+        cache.invalidate("dashboard")
+    return report
+
+
+def upload_sweeper_loop(stop_event):
+    run_leased("upload-sweeper", sweep_uploads, app.config["UPLOAD_SWEEP_INTERVAL"], stop_event)
+
+
+upload_sweeper_stop = threading.Event()
+
+def start_upload_sweeper():
+    thread = threading.Thread(target=upload_sweeper_loop, args=(upload_sweeper_stop,),
+                              name="upload-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+
+@app.route("/storage/usage")
+@admin_login_required
+@read_replica
+def storage_usage():
+    """Disk usage report; a dry run of the sweeper, nothing is deleted."""
+    return jsonify(sweep_uploads(dry_run=True))
+
+
+@app.cli.command("sweep-uploads")
+@click.option("--grace-hours", type=int, default=None, help="Minimum age of an orphan before it is deleted.")
+@click.option("--dry-run", is_flag=True, help="Report only, delete nothing.")
+def sweep_uploads_command(grace_hours, dry_run):
+    """Delete uploads no request references and report disk usage."""
+    report = sweep_uploads(grace_hours, dry_run)
+    for service, summary in report["services"].items():
+        click.echo(f"{service}: {summary['files']} files, {summary['bytes']} bytes, "
+                   f"{summary['orphaned']['files']} orphaned, {summary['reclaimed']['files']} reclaimed")
+        for label, bucket in summary["ages"].items():
+            click.echo(f"  {label:>7}: {bucket['files']} files, {bucket['bytes']} bytes")
+
+# ======================================================
+# BULK EXPORT
+# ======================================================
+
+EXPORT_BATCH_SIZE = 200
+
+def _export_ids(args):
+    """Explicit selection from ``ids``: "assignments:12" or "assignment:12", repeated or comma separated."""
+    selected = {}
+    for value in args.getlist("ids"):
+        for part in value.split(","):
+            service, _, id = part.strip().partition(":")
+            service = SERVICE_NAMES.get(service, service)
+            if service in SERVICE_MODELS and id.isdigit():
+                selected.setdefault(service, set()).add(int(id))
+    return selected
+
+
+def export_jobs(args):
+    """
+    Yield an ExportJob per request picked by ``args``: the ``ids`` selection
+    if given, otherwise the service, status, university, state and from/to
+    (deadline) filters. Rows are read in batches as plain column dicts.
+    """
+    selected = _export_ids(args) if args.getlist("ids") else None
+    service_arg = args.get("service")
+    services = [service_arg] if service_arg in SERVICE_MODELS else list(SERVICE_MODELS)
+    singular = {service: name for name, service in SERVICE_NAMES.items()}
+
+    for service in services:
+        model, date_field, _, _, file_field = SERVICE_MODELS[service]
+
+        if selected is not None:
+            ids = sorted(selected.get(service, ()))
+        else:
+            query = db.session.query(model.id)
+            if args.get("status"):
+                query = query.filter(model.status == args["status"])
+            if args.get("university"):
+                query = query.filter(model.university == args["university"])
+            if args.get("state"):
+                query = query.filter(model.deadline_state == args["state"])
+            date_from = _parse_date_arg(args.get("from"))
+            if date_from:
+                query = query.filter(getattr(model, date_field) >= date_from)
+            date_to = _parse_date_arg(args.get("to"))
+            if date_to:
+                query = query.filter(getattr(model, date_field) <= date_to)
+            ids = [id for (id,) in query.order_by(model.id)]
+
+        table = model.__table__
+        for offset in range(0, len(ids), EXPORT_BATCH_SIZE):
+            batch = ids[offset:offset + EXPORT_BATCH_SIZE]
+            for row in db.session.execute(table.select().where(table.c.id.in_(batch)).order_by(table.c.id)).mappings():
+                values = dict(row)
+                files = []
+                if values[file_field]:
+                    files.append((values[file_field], service, values[file_field]))
+                if values["proof_of_payment"]:
+                    files.append((f"payment_{values['proof_of_payment']}", "payments", values["proof_of_payment"]))
+                yield ExportJob(service, f"{service}/{singular[service]}_{values['id']}", values, files)
+
+
+@app.route("/export/zip", methods=["GET", "POST"])
+@admin_login_required
+@read_replica
+def export_zip():
+    """
+    ZIP of the selected requests: each one's details PDF, upload and payment
+    proof. Streamed while it is built, so large selections start at once.
+    """
+    stream = stream_export(export_jobs(request.values), storage.open, app.config["EXPORT_WORKERS"])
+    response = Response(stream_with_context(stream), mimetype="application/zip")
+    response.headers['Content-Disposition'] = (
+        f"attachment; filename=requests_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    )
+    return response
+
+# ======================================================
+# ANALYTICS
+# ======================================================
+
+# Statuses that mean the request was never paid for; everything else counts
+# as converted from "Pending Payment"
+UNPAID_STATUSES = ("Pending Payment", "Expired")
+
+def rollup_key(service, created_at, university, status):
+    if created_at is None:
+        return None
+    day = created_at.date() if isinstance(created_at, datetime) else created_at
+    return (day, service, university or "", status or "")
+
+
+_rollup_upserts = {}
+
+def rollup_upsert(dialect):
+    """
+    Single-statement upsert adding to a rollup counter, safe with several
+    workers writing at once, or None where the dialect has none. Built once
+    per dialect against the table, so every write skips statement
+    construction and the ORM bulk-insert path.
+    """
+    if dialect not in ("sqlite", "postgresql"):
+        return None
+    if dialect not in _rollup_upserts:
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        table = RequestRollup.__table__
+        stmt = insert(table)
+        _rollup_upserts[dialect] = stmt.on_conflict_do_update(
+            index_elements=["day", "service", "university", "status"],
+            set_={"count": table.c.count + stmt.excluded["count"]},
+        )
+    return _rollup_upserts[dialect]
+
+def update_rollups(deltas):
+    """
+    Add ``deltas`` ({(day, service, university, status): delta}) to the
+    rollup counters in the current transaction, so they commit or roll back
+    together with the write that caused them.
+    """
+    rows = [{"day": key[0], "service": key[1], "university": key[2], "status": key[3], "count": delta}
+            for key, delta in deltas.items() if key is not None and delta]
+    if not rows:
+        return
+
+    stmt = rollup_upsert(db.engine.dialect.name)
+    if stmt is not None:
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        result = db.session.execute(
+            update(RequestRollup)
+            .where(RequestRollup.day == row["day"], RequestRollup.service == row["service"],
+                   RequestRollup.university == row["university"], RequestRollup.status == row["status"])
+            .values(count=RequestRollup.count + row["count"])
+        )
+        if not result.rowcount:
+            db.session.add(RequestRollup(**row))
+
+
+def rollup_request(service, item, delta=1):
+    """Count a created (+1) or deleted (-1) request. ``item`` must be flushed."""
+    update_rollups({rollup_key(service, item.created_at, item.university, item.status): delta})
+
+
+def _status_is(model, status):
+    return model.status.is_(None) if status is None else model.status == status
+
+
+def change_status(service, item, status, **values):
+    """
+    Set ``item``'s status (and any other column ``values``) in the current
+    transaction and count the change in the rollups. The UPDATE only matches
+    the status last read; when another writer (an admin, the deadline pass)
+    changed it first, the row is read again and the write retried, so the
+    rollup delta is always taken from the status actually replaced.
+    """
+    model = SERVICE_MODELS[service][0]
+    old_status = item.status
+    while not db.session.execute(
+            update(model).where(model.id == item.id, _status_is(model, old_status))
+            .values(status=status, **values)
+            .execution_options(synchronize_session="fetch")).rowcount:
+        row = db.session.query(model.status).filter(model.id == item.id).first()
+        if row is None:
+            abort(404)
+        old_status = row.status
+
+    if old_status != status:
+        update_rollups({
+            rollup_key(service, item.created_at, item.university, old_status): -1,
+            rollup_key(service, item.created_at, item.university, status): 1,
+        })
+
+
+def delete_request(service, item):
+    """Delete ``item`` and uncount it under the status it had when deleted."""
+    model = SERVICE_MODELS[service][0]
+    status = item.status
+    while not db.session.execute(
+            delete(model).where(model.id == item.id, _status_is(model, status))
+            .execution_options(synchronize_session="fetch")).rowcount:
+        row = db.session.query(model.status).filter(model.id == item.id).first()
+        if row is None:
+            abort(404)
+        status = row.status
+
+    update_rollups({rollup_key(service, item.created_at, item.university, status): -1})
+
+
+def rebuild_request_rollups():
+    """
+    Recount every rollup from the request and archive tables. Only needed
+    once for data that predates the rollups; the write paths keep them
+    current afterwards. Archived requests stay counted, deleted ones don't.
+    """
+    deltas = {}
+
+    def count(service, day, university, status, n):
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        key = rollup_key(service, day, university, status)
+        deltas[key] = deltas.get(key, 0) + n
+
+    for service, (model, *_) in SERVICE_MODELS.items():
+        day = func.date(model.created_at)
+        for row_day, university, status, n in (
+                db.session.query(day, model.university, model.status, func.count())
+                .filter(model.created_at.isnot(None))
+                .group_by(day, model.university, model.status)):
+            count(service, row_day, university, status, n)
+
+    day = func.date(ArchivedRequest.created_at)
+    for service, row_day, university, status, n in (
+            db.session.query(ArchivedRequest.service, day, ArchivedRequest.university,
+                             ArchivedRequest.status, func.count())
+            .filter(ArchivedRequest.created_at.isnot(None))
+            .group_by(ArchivedRequest.service, day, ArchivedRequest.university, ArchivedRequest.status)):
+        count(service, row_day, university, status, n)
+
+    db.session.query(RequestRollup).delete(synchronize_session=False)
+    update_rollups(deltas)
+    db.session.commit()
+    cache.invalidate("analytics")
+    return sum(deltas.values())
+
+
+def ensure_rollups():
+    # First start after upgrading: backfill the counters once. This runs from
+    # init_database, i.e. once per deploy, but a flask command started
+    # alongside could get here too. Two rebuilds adding the same upserts
+    # would double every counter, so the check and the rebuild run under a
+    # lease and whoever doesn't get it leaves the backfill to the holder.
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if not acquire_scheduler_lock("rollup-backfill", owner, timedelta(minutes=10)):
+        return
+    try:
+        if RequestRollup.query.first() is not None:
+            return
+        if not any(db.session.query(model.id).first() for model, *_ in SERVICE_MODELS.values()) \
+                and db.session.query(ArchivedRequest.id).first() is None:
+            return
+        rebuild_request_rollups()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        release_scheduler_lock("rollup-backfill", owner)
+
+
+def analytics_summary(start, end, service=None, university=None):
+    """
+    Daily request volume and payment conversion between ``start`` and
+    ``end`` (inclusive), read from the rollups only.
+    """
+    query = db.session.query(RequestRollup).filter(
+        RequestRollup.day.between(start, end), RequestRollup.count != 0
+    )
+    if service:
+        query = query.filter(RequestRollup.service == service)
+    if university:
+        query = query.filter(RequestRollup.university == university)
+
+    def bucket():
+        return {"requests": 0, "paid": 0}
+
+    days = {}
+    universities = {}
+    services = {}
+    statuses = {}
+    totals = bucket()
+
+    for rollup in query:
+        paid = 0 if rollup.status in UNPAID_STATUSES else rollup.count
+        day = days.setdefault(rollup.day, dict(bucket(), universities={}))
+        for target in (day, totals,
+                       universities.setdefault(rollup.university, bucket()),
+                       services.setdefault(rollup.service, bucket())):
+            target["requests"] += rollup.count
+            target["paid"] += paid
+        day["universities"][rollup.university] = day["universities"].get(rollup.university, 0) + rollup.count
+        statuses[rollup.status] = statuses.get(rollup.status, 0) + rollup.count
+
+    def with_rate(values):
+        values["conversion_rate"] = round(values["paid"] / values["requests"], 3) if values["requests"] else 0.0
+        return values
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "totals": with_rate(dict(totals, statuses=statuses)),
+        "services": {name: with_rate(values) for name, values in sorted(services.items())},
+        "universities": {name: with_rate(values) for name, values in
+                         sorted(universities.items(), key=lambda item: -item[1]["requests"])},
+        "days": [with_rate(dict(values, day=day.isoformat())) for day, values in sorted(days.items())],
+    }
+
+
+def analytics_args(args):
+    end = _parse_date_arg(args.get("to")) or date.today()
+    start = _parse_date_arg(args.get("from")) or end - timedelta(days=29)
+    service = args.get("service") if args.get("service") in SERVICE_MODELS else None
+    return start, end, service, args.get("university") or None
+
+
+@app.route("/analytics")
+@admin_login_required
+@read_replica
+def analytics():
+    start, end, service, university = analytics_args(request.args)
+    cache_key = f"{start}:{end}:{service}:{university}"
+    summary = cache.get_or_set("analytics", cache_key,
+                               lambda: analytics_summary(start, end, service, university),
+                               store=cacheable())
+    return jsonify(summary)
+
+
+@app.route("/analytics/report")
+@admin_login_required
+@read_replica
+def analytics_report():
+    start, end, service, university = analytics_args(request.args)
+    summary = analytics_summary(start, end, service, university)
+    scope = ", ".join(filter(None, [service, university])) or "All services"
+
+    response = make_response(render_analytics_pdf(summary, scope))
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f'attachment; filename=analytics_{summary["from"]}_{summary["to"]}.pdf'
+
+    return response
+
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recount the analytics rollups from the request and archive tables."""
+    total = rebuild_request_rollups()
+    click.echo(f"{total} request(s) counted")
+
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -579,65 +1680,52 @@ def login():
 
 @app.route("/dashboard")
 @admin_login_required
+@read_replica
 def dashboard():
-    from datetime import date
-    
-    # Get today's date
     today = date.today()
     
+    # The rendered page only depends on the data, the day and who is logged
+    # in; writes invalidate the "dashboard" namespace
+    cache_key = f"html:{session.get('username')}:{today.isoformat()}"
+    html = cache.get_or_set("dashboard", cache_key,
+                            lambda: render_template("dashboard.html", today=today, **dashboard_context()),
+                            store=cacheable())
+    
+    return html
+
+def dashboard_context():
     # Get all records ordered by date
-    assignments = Assignment.query.order_by(Assignment.due_date.desc()).all()
-    quizzes = QuizRequest.query.order_by(QuizRequest.test_date.desc()).all()
-    exams = ExamRequest.query.order_by(ExamRequest.exam_date.desc()).all()
+    assignments = load_listing(AssignmentRow, Assignment, Assignment.due_date.desc())
+    quizzes = load_listing(QuizRow, QuizRequest, QuizRequest.test_date.desc())
+    exams = load_listing(ExamRow, ExamRequest, ExamRequest.exam_date.desc())
+    
+    # Add file existence info to each record, listing each folder once
+    # instead of checking every file separately
+    stored = {service: storage.list(service) for service in UPLOAD_SERVICES}
     
-    # Add file existence info to each record
     for a in assignments:
-        a.assignment_file_exists = False
-        a.payment_file_exists = False
-        
-        if a.assignment_file:
-            file_path = os.path.join("static/uploads/assignments", a.assignment_file)
-            a.assignment_file_exists = os.path.exists(file_path)
-        
-        if a.proof_of_payment:
-            payment_path = os.path.join("static/uploads/payments", a.proof_of_payment)
-            a.payment_file_exists = os.path.exists(payment_path)
+        a.assignment_file_exists = bool(a.assignment_file) and a.assignment_file in stored["assignments"]
+        a.payment_file_exists = bool(a.proof_of_payment) and a.proof_of_payment in stored["payments"]
     
     for q in quizzes:
-        q.quiz_file_exists = False
-        q.payment_file_exists = False
-        
-        if q.quiz_file:
-            file_path = os.path.join("static/uploads/quizzes", q.quiz_file)
-            q.quiz_file_exists = os.path.exists(file_path)
-        
-        if q.proof_of_payment:
-            payment_path = os.path.join("static/uploads/payments", q.proof_of_payment)
-            q.payment_file_exists = os.path.exists(payment_path)
+        q.quiz_file_exists = bool(q.quiz_file) and q.quiz_file in stored["quizzes"]
+        q.payment_file_exists = bool(q.proof_of_payment) and q.proof_of_payment in stored["payments"]
     
     for e in exams:
-        e.exam_file_exists = False
-        e.payment_file_exists = False
-        
-        if e.exam_file:
-            file_path = os.path.join("static/uploads/exams", e.exam_file)
-            e.exam_file_exists = os.path.exists(file_path)
-        
-        if e.proof_of_payment:
-            payment_path = os.path.join("static/uploads/payments", e.proof_of_payment)
-            e.payment_file_exists = os.path.exists(payment_path)
+        e.exam_file_exists = bool(e.exam_file) and e.exam_file in stored["exams"]
+        e.payment_file_exists = bool(e.proof_of_payment) and e.proof_of_payment in stored["payments"]
     
-    # Count active (not expired) records
+    # Count active (not expired) records from the stored deadline state
     active_assignments_count = Assignment.query.filter(
-        Assignment.due_date >= today
+        Assignment.deadline_state != "expired"
     ).count()
     
     active_quizzes_count = QuizRequest.query.filter(
-        QuizRequest.test_date >= today
+        QuizRequest.deadline_state != "expired"
     ).count()
     
     active_exams_count = ExamRequest.query.filter(
-        ExamRequest.exam_date >= today
+        ExamRequest.deadline_state != "expired"
     ).count()
     
     # Statistics for dashboard
@@ -656,12 +1744,17 @@ def dashboard():
                         (active_assignments_count + active_quizzes_count + active_exams_count)
     }
     
-    return render_template("dashboard.html",
-                           assignments=assignments,
-                           quizzes=quizzes,
-                           exams=exams,
-                           today=today,
-                           stats=stats)
+    return {
+        "assignments": assignments,
+        "quizzes": quizzes,
+        "exams": exams,
+        "stats": stats,
+    }
+
+@app.route("/cache/stats")
+@admin_login_required
+def cache_stats():
+    return jsonify(cache.stats())
 
 @app.route("/assignment-assistance")
 def assignment_assistance():
@@ -670,12 +1763,13 @@ def assignment_assistance():
 @app.route("/submit-assignment", methods=["POST"])
 def submit_assignment():
     file = request.files.get("file")
-    filename = None
+    fingerprint = submission_fingerprint(request.form["email"], request.form["subject"], request.form["due_date"],
+                                         upload_fingerprint("assignments", file))
+    previous = find_submission("submit_assignment", fingerprint)
+    if previous is not None:
+        return replay_submission(previous)
     
-    if file and file.filename and allowed_file(file.filename):
-        os.makedirs("static/uploads/assignments", exist_ok=True)
-        filename = secure_filename(file.filename)
-        file.save(f"static/uploads/assignments/{filename}")
+    filename = save_upload("assignments", file)
     
     assignment = Assignment(
         name=request.form["name"],
@@ -688,9 +1782,16 @@ def submit_assignment():
         details=request.form["details"],
         assignment_file=filename
     )
+    apply_deadline_state(assignment, assignment.due_date)
     
     db.session.add(assignment)
-    db.session.commit()
+    db.session.flush()
+    rollup_request("assignments", assignment)
+    record_submission("submit_assignment", "assignments", assignment.id, fingerprint)
+    replay = commit_submission("submit_assignment", fingerprint)
+    if replay is not None:
+        return replay
+    invalidate_request_caches("assignments", assignment.id)
     
     # Store assignment ID in session
     session["assignment_id"] = assignment.id
@@ -707,40 +1808,52 @@ def payment():
 @app.route("/upload-proof", methods=["POST"])
 def upload_proof():
     proof = request.files.get("proof")
-    filename = None
+    service_type = session.get("service_type", "Assignment Assistance")
     
-    if proof and proof.filename and allowed_file(proof.filename):
-        os.makedirs("static/uploads/payments", exist_ok=True)
-        filename = secure_filename(proof.filename)
-        proof.save(os.path.join("static/uploads/payments", filename))
+    service = next((service for service, (_, name) in SUBMISSION_SESSION_KEYS.items() if name == service_type),
+                   "assignments")
+    fingerprint = submission_fingerprint(service, session.get(SUBMISSION_SESSION_KEYS[service][0]),
+                                         upload_fingerprint("payments", proof))
+    previous = find_submission("upload_proof", fingerprint)
+    if previous is not None:
+        return replay_submission(previous)
     
-    service_type = session.get("service_type", "Assignment Assistance")
+    filename = save_upload("payments", proof)
     
     if service_type == "Quiz Assistance":
         quiz_id = session.get("quiz_id")
         if quiz_id:
             quiz = QuizRequest.query.get_or_404(quiz_id)
-            quiz.proof_of_payment = filename
-            quiz.status = "Payment Submitted"
-            db.session.commit()
+            change_status("quizzes", quiz, "Payment Submitted", proof_of_payment=filename)
+            record_submission("upload_proof", "quizzes", quiz.id, fingerprint)
+            replay = commit_submission("upload_proof", fingerprint)
+            if replay is not None:
+                return replay
+            invalidate_request_caches("quizzes", quiz.id)
             flash("Payment proof uploaded successfully!", "success")
     
     elif service_type == "Exam Assistance":
         exam_id = session.get("exam_id")
         if exam_id:
             exam = ExamRequest.query.get_or_404(exam_id)
-            exam.proof_of_payment = filename
-            exam.status = "Payment Submitted"
-            db.session.commit()
+            change_status("exams", exam, "Payment Submitted", proof_of_payment=filename)
+            record_submission("upload_proof", "exams", exam.id, fingerprint)
+            replay = commit_submission("upload_proof", fingerprint)
+            if replay is not None:
+                return replay
+            invalidate_request_caches("exams", exam.id)
             flash("Payment proof uploaded successfully!", "success")
     
     else:  # Assignment Assistance
         assignment_id = session.get("assignment_id")
         if assignment_id:
             assignment = Assignment.query.get_or_404(assignment_id)
-            assignment.proof_of_payment = filename
-            assignment.status = "Payment Submitted"
-            db.session.commit()
+            change_status("assignments", assignment, "Payment Submitted", proof_of_payment=filename)
+            record_submission("upload_proof", "assignments", assignment.id, fingerprint)
+            replay = commit_submission("upload_proof", fingerprint)
+            if replay is not None:
+                return replay
+            invalidate_request_caches("assignments", assignment.id)
             flash("Payment proof uploaded successfully!", "success")
     
     session["payment_time"] = datetime.now().isoformat()
@@ -786,12 +1899,13 @@ def exam_assistance():
 @app.route("/submit-exam", methods=["POST"])
 def submit_exam():
     file = request.files.get("file")
-    filename = None
+    fingerprint = submission_fingerprint(request.form["email"], request.form["subject"], request.form["exam_date"],
+                                         upload_fingerprint("exams", file))
+    previous = find_submission("submit_exam", fingerprint)
+    if previous is not None:
+        return replay_submission(previous)
     
-    if file and file.filename and allowed_file(file.filename):
-        os.makedirs("static/uploads/exams", exist_ok=True)
-        filename = secure_filename(file.filename)
-        file.save(f"static/uploads/exams/{filename}")
+    filename = save_upload("exams", file)
     
     exam = ExamRequest(
         name=request.form["name"],
@@ -804,9 +1918,16 @@ def submit_exam():
         topics=request.form.get("topics"),
         exam_file=filename
     )
+    apply_deadline_state(exam, exam.exam_date)
     
     db.session.add(exam)
-    db.session.commit()
+    db.session.flush()
+    rollup_request("exams", exam)
+    record_submission("submit_exam", "exams", exam.id, fingerprint)
+    replay = commit_submission("submit_exam", fingerprint)
+    if replay is not None:
+        return replay
+    invalidate_request_caches("exams", exam.id)
     
     session["exam_id"] = exam.id
     session["service_type"] = "Exam Assistance"
@@ -818,12 +1939,14 @@ def submit_exam():
 @app.route("/submit-quiz", methods=["POST"])
 def submit_quiz():
     file = request.files.get("file")
-    filename = None
+    fingerprint = submission_fingerprint(request.form.get("email"), request.form.get("subject"),
+                                         request.form.get("test_date"),
+                                         upload_fingerprint("quizzes", file))
+    previous = find_submission("submit_quiz", fingerprint)
+    if previous is not None:
+        return replay_submission(previous)
     
-    if file and file.filename and allowed_file(file.filename):
-        os.makedirs("static/uploads/quizzes", exist_ok=True)
-        filename = secure_filename(file.filename)
-        file.save(f"static/uploads/quizzes/{filename}")
+    filename = save_upload("quizzes", file)
     
     quiz = QuizRequest(
         name=request.form.get("name"),
@@ -836,9 +1959,16 @@ def submit_quiz():
         topics=request.form.get("topics"),
         quiz_file=filename
     )
+    apply_deadline_state(quiz, quiz.test_date)
     
     db.session.add(quiz)
-    db.session.commit()
+    db.session.flush()
+    rollup_request("quizzes", quiz)
+    record_submission("submit_quiz", "quizzes", quiz.id, fingerprint)
+    replay = commit_submission("submit_quiz", fingerprint)
+    if replay is not None:
+        return replay
+    invalidate_request_caches("quizzes", quiz.id)
     
     session["quiz_id"] = quiz.id
     session["service_type"] = "Quiz Assistance"
@@ -862,9 +1992,10 @@ def update_status(service, id):
         abort(404)
     
     if new_status:
-        item.status = new_status
+        change_status(SERVICE_NAMES[service], item, new_status)
     
     db.session.commit()
+    invalidate_request_caches(SERVICE_NAMES[service], id)
     
     flash(f"{service.capitalize()} status updated successfully!", "success")
     return redirect(url_for("dashboard"))
@@ -881,8 +2012,9 @@ def delete_record(service, id):
     else:
         abort(404)
     
-    db.session.delete(item)
+    delete_request(SERVICE_NAMES[service], item)
     db.session.commit()
+    invalidate_request_caches(SERVICE_NAMES[service], id)
     
     flash(f"{service.capitalize()} deleted successfully!", "success")
     return redirect(url_for("dashboard"))
@@ -970,18 +2102,117 @@ def internal_error(error):
     </html>
     """, 500
 
+# ======================================================
+# ADMISSION CONTROL
+# ======================================================
+
+# Unauthenticated endpoints that store a file and commit a row, or (presign)
+# let the browser store one straight in the bucket
+RATE_LIMITED_ENDPOINTS = ("submit_assignment", "submit_quiz", "submit_exam", "upload_proof", "presign_upload")
+PRESIGN_PATHS = frozenset(rule.rule for rule in app.url_map.iter_rules() if rule.endpoint == "presign_upload")
+
+@app.before_request
+def assign_client_id():
+    # Stable per-browser id for the per-session rate limit; the session
+    # cookie itself changes whenever the session does
+    if "client_id" not in session:
+        session["client_id"] = secrets.token_hex(8)
+
+def client_ip(environ):
+    forwarded = [part.strip() for part in environ.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+    proxies = app.config["RATE_LIMIT_PROXY_COUNT"]
+    if proxies and len(forwarded) >= proxies:
+        # Entries left of the ones our proxies appended are client-supplied
+        return forwarded[-proxies]
+    return environ.get("REMOTE_ADDR", "")
+
+def client_session_id(environ):
+    cookie = parse_cookie(environ).get(app.config["SESSION_COOKIE_NAME"])
+    serializer = app.session_interface.get_signing_serializer(app)
+    if not cookie or serializer is None:
+        return None
+    try:
+        return serializer.loads(cookie).get("client_id")
+    except BadSignature:
+        return None
+
+def admission_buckets(environ):
+    # Presigns draw from buckets of their own: a direct upload costs a
+    # presign and a form post, and shouldn't halve the form's allowance
+    scope = "presign:" if environ.get("PATH_INFO") in PRESIGN_PATHS else ""
+    buckets = [(f"{scope}ip:{client_ip(environ)}", *parse_rate(app.config["RATE_LIMIT_PER_IP"]))]
+    client_id = client_session_id(environ)
+    if client_id:
+        buckets.append((f"{scope}session:{client_id}", *parse_rate(app.config["RATE_LIMIT_PER_SESSION"])))
+    return buckets
+
+app.wsgi_app = AdmissionControl(
+    app.wsgi_app,
+    limiter,
+    paths=[rule.rule for rule in app.url_map.iter_rules() if rule.endpoint in RATE_LIMITED_ENDPOINTS],
+    buckets=admission_buckets,
+    upload_limit=app.config["UPLOAD_CONCURRENCY_LIMIT"] if app.config["RATE_LIMIT_ENABLED"] else 0,
+    upload_ttl=int(os.environ.get("GUNICORN_TIMEOUT", 60)) * 2,
+)
+
 # ======================================================
 # INIT
 # ======================================================
 
-with app.app_context():
-    db.create_all()
-    ensure_dirs()
-    create_default_admin()
+def init_database():
+    with app.app_context():
+        db.create_all()
+        ensure_columns()
+        ensure_indexes()
+        ensure_dirs()
+        create_default_admin()
+        ensure_rollups()
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create or upgrade the schema and seed the defaults."""
+    init_database()
+    click.echo("Database ready")
+
+# Schema set-up is not safe to run from several processes at once. Under
+# gunicorn the master runs it once (``flask init-db`` from the on_starting
+# hook in gunicorn.conf.py) and sets DATABASE_INITIALIZED, so workers only
+# attach to the migrated database. Under ``python main.py`` the bulk
+# export's spawned render workers (exports.render_pool) re-run this script
+# as __mp_main__; they only call into reports.py and must not touch it either.
+if __name__ != "__mp_main__" and os.environ.get("DATABASE_INITIALIZED") != "1":
+    init_database()
+
+def start_background_jobs():
+    """
+    Start the background loops. Called once per serving process (gunicorn's
+    post_worker_init hook, or ``python main.py``), never at import, so
+    ``flask`` commands and scripts importing main run none of them. The
+    deadline scheduler runs its first pass straight away, under its lease.
+    """
+    threads = []
+    if app.config["DEADLINE_SCHEDULER_ENABLED"]:
+        threads.append(start_deadline_scheduler())
+    if app.config["UPLOAD_SWEEPER_ENABLED"]:
+        threads.append(start_upload_sweeper())
+    if app.config["ARCHIVE_SCHEDULER_ENABLED"]:
+        threads.append(start_archive_scheduler())
+    # Runs on interpreter exit, which gunicorn workers reach through sys.exit
+    atexit.register(stop_background_jobs, threads)
+    return threads
+
+def stop_background_jobs(threads, timeout=5):
+    """Stop the loops and wait briefly for them to release their leases."""
+    deadline_scheduler_stop.set()
+    upload_sweeper_stop.set()
+    archive_scheduler_stop.set()
+    for thread in threads:
+        thread.join(timeout)
 
 # ======================================================
 # ENTRY POINT (IMPORTANT)
 # ======================================================
 
 if __name__ == "__main__":
+    start_background_jobs()
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
\ No newline at end of file
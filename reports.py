@@ -0,0 +1,301 @@
+"""
+PDF documents: per-request details, per-service listings and the analytics
+report.
+
+Layouts are data (``REQUEST_LAYOUTS``, ``LISTING_LAYOUTS``) read by a few
+generic renderers. Paragraph and table styles are built once when the
+module is imported and shared by every document this process renders;
+reportlab only reads them.
+
+Kept apart from main.py (no Flask or database imports) so the bulk export
+can render in worker processes that never load the app.
+"""
+
+from collections import Counter, namedtuple
+from datetime import date, datetime
+from io import BytesIO
+from types import SimpleNamespace
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+# ======================================================
+# STYLES
+# ======================================================
+
+_sample = getSampleStyleSheet()
+
+NORMAL_STYLE = _sample["Normal"]
+
+DETAIL_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_sample['Heading1'],
+    fontSize=16,
+    spaceAfter=30
+)
+
+DETAIL_HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_sample['Heading2'],
+    fontSize=12,
+    spaceAfter=6,
+    spaceBefore=12
+)
+
+REPORT_TITLE_STYLE = ParagraphStyle(
+    'ReportTitle',
+    parent=_sample['Heading1'],
+    fontSize=14,
+    alignment=1,  # Center alignment
+    spaceAfter=20
+)
+
+REPORT_HEADING_STYLE = ParagraphStyle(
+    'ReportHeading',
+    parent=_sample['Heading2'],
+    fontSize=10,
+    spaceAfter=6,
+    spaceBefore=12
+)
+
+# Label/value tables on the details pages
+DETAILS_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+# Grid with a grey header row on the reports
+GRID_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+])
+
+DETAILS_COL_WIDTHS = [1.5*inch, 4*inch]
+
+# ======================================================
+# LAYOUTS
+# ======================================================
+
+# label, attribute, value shown when the attribute is empty
+Field = namedtuple("Field", "label attribute default", defaults=("",))
+Section = namedtuple("Section", "heading fields")
+# text: (heading, attribute) of the free-text block; text_optional skips it when empty
+RequestLayout = namedtuple("RequestLayout", "title sections text text_optional")
+
+# header, attribute, column width, characters kept before "..."
+Column = namedtuple("Column", "header attribute width truncate", defaults=(None,))
+ListingLayout = namedtuple("ListingLayout", "title filename columns")
+
+STUDENT_FIELDS = (
+    Field("Name:", "name"),
+    Field("Email:", "email"),
+    Field("Contact:", "contact"),
+    Field("University:", "university"),
+)
+
+REQUEST_LAYOUTS = {
+    "assignments": RequestLayout(
+        title="Assignment Details",
+        sections=(
+            Section("Student Information", STUDENT_FIELDS),
+            Section("Assignment Details", (
+                Field("Assignment Type:", "assignment_type"),
+                Field("Subject:", "subject"),
+                Field("Due Date:", "due_date"),
+                Field("Status:", "status"),
+                Field("Created:", "created_at"),
+            )),
+        ),
+        text=("Assignment Description", "details"),
+        text_optional=False,
+    ),
+    "quizzes": RequestLayout(
+        title="Quiz Request Details",
+        sections=(
+            Section("Student Information", STUDENT_FIELDS[:3] + (Field("University:", "university", "Not specified"),)),
+            Section("Quiz Details", (
+                Field("Quiz Type:", "quiz_type"),
+                Field("Subject:", "subject"),
+                Field("Test Date:", "test_date"),
+                Field("Status:", "status"),
+                Field("Created:", "created_at"),
+            )),
+        ),
+        text=("Topics to Cover", "topics"),
+        text_optional=True,
+    ),
+    "exams": RequestLayout(
+        title="Exam Request Details",
+        sections=(
+            Section("Student Information", STUDENT_FIELDS),
+            Section("Exam Details", (
+                Field("Exam Type:", "exam_type"),
+                Field("Subject:", "subject"),
+                Field("Exam Date:", "exam_date"),
+                Field("Status:", "status"),
+                Field("Created:", "created_at"),
+            )),
+        ),
+        text=("Topics to Cover", "topics"),
+        text_optional=True,
+    ),
+}
+
+
+def _listing_columns(date_header, date_attribute):
+    return (
+        Column("ID", "id", 0.5*inch),
+        Column("Name", "name", 1.5*inch, 20),
+        Column("Subject", "subject", 1.5*inch, 15),
+        Column(date_header, date_attribute, 1*inch),
+        Column("Status", "status", 1.2*inch),
+        Column("Created", "created_at", 1*inch),
+    )
+
+
+LISTING_LAYOUTS = {
+    "assignments": ListingLayout("All Assignments Report", "all_assignments_report.pdf",
+                                 _listing_columns("Due Date", "due_date")),
+    "quizzes": ListingLayout("All Quizzes Report", "all_quizzes_report.pdf",
+                             _listing_columns("Date", "test_date")),
+    "exams": ListingLayout("All Exams Report", "all_exams_report.pdf",
+                           _listing_columns("Date", "exam_date")),
+}
+
+# ======================================================
+# RENDERING
+# ======================================================
+
+def _format(value, default=""):
+    if value is None or value == "":
+        return default
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+def _truncate(text, limit):
+    if limit and len(text) > limit:
+        return text[:limit] + "..."
+    return text
+
+
+def _build(elements, **page):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, **page)
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _grid_table(rows, col_widths):
+    table = Table(rows, colWidths=col_widths)
+    table.setStyle(GRID_TABLE_STYLE)
+    return table
+
+
+def render_request_pdf(service, item):
+    """
+    Return the details PDF of one request as bytes. ``item`` is a model
+    instance, or a dict of its columns when sent to an export worker.
+    """
+    if isinstance(item, dict):
+        item = SimpleNamespace(**item)
+    layout = REQUEST_LAYOUTS[service]
+
+    elements = [Paragraph(layout.title, DETAIL_TITLE_STYLE), Spacer(1, 20)]
+
+    for section in layout.sections:
+        elements.append(Paragraph(section.heading, DETAIL_HEADING_STYLE))
+        table = Table([[field.label, _format(getattr(item, field.attribute), field.default)]
+                       for field in section.fields], colWidths=DETAILS_COL_WIDTHS)
+        table.setStyle(DETAILS_TABLE_STYLE)
+        elements.append(table)
+        elements.append(Spacer(1, 20))
+
+    heading, attribute = layout.text
+    text = getattr(item, attribute)
+    if text or not layout.text_optional:
+        elements.append(Paragraph(heading, DETAIL_HEADING_STYLE))
+        elements.append(Paragraph(text or "", NORMAL_STYLE))
+
+    return _build(elements)
+
+
+def render_listing_pdf(service, items, generated_at=None):
+    """All requests of a service in one table, followed by counts per status."""
+    layout = LISTING_LAYOUTS[service]
+    generated_at = generated_at or datetime.now()
+
+    rows = [[column.header for column in layout.columns]]
+    for item in items:
+        rows.append([_truncate(_format(getattr(item, column.attribute)), column.truncate)
+                     for column in layout.columns])
+
+    elements = [
+        Paragraph(layout.title, REPORT_TITLE_STYLE),
+        Spacer(1, 10),
+        Paragraph(f"Generated on: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}", NORMAL_STYLE),
+        Spacer(1, 20),
+        _grid_table(rows, [column.width for column in layout.columns]),
+        Spacer(1, 20),
+        Paragraph("Summary", REPORT_HEADING_STYLE),
+    ]
+
+    for status, count in Counter(item.status for item in items).items():
+        elements.append(Paragraph(f"{status}: {count} requests", NORMAL_STYLE))
+
+    elements.append(Spacer(1, 10))
+    elements.append(Paragraph(f"Total Requests: {len(items)}", NORMAL_STYLE))
+
+    return _build(elements, leftMargin=0.5*inch, rightMargin=0.5*inch)
+
+
+def render_analytics_pdf(summary, scope, generated_at=None):
+    """The analytics report for a ``summary`` from main.analytics_summary()."""
+    generated_at = generated_at or datetime.now()
+
+    def rate(values):
+        return f"{values['conversion_rate'] * 100:.1f}%"
+
+    totals = summary["totals"]
+    elements = [
+        Paragraph("Request Analytics Report", REPORT_TITLE_STYLE),
+        Paragraph(f"{scope}: {summary['from']} to {summary['to']}", NORMAL_STYLE),
+        Paragraph(f"Generated on: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}", NORMAL_STYLE),
+        Spacer(1, 10),
+        Paragraph(f"Total Requests: {totals['requests']} &nbsp; Paid: {totals['paid']} &nbsp; "
+                  f"Payment Conversion: {rate(totals)}", NORMAL_STYLE),
+    ]
+
+    rows = [["Date", "Requests", "Paid", "Conversion"]]
+    for day in summary["days"]:
+        rows.append([day["day"], str(day["requests"]), str(day["paid"]), rate(day)])
+    elements.append(Paragraph("Daily Volume", REPORT_HEADING_STYLE))
+    elements.append(_grid_table(rows, [1.5*inch, 1.2*inch, 1.2*inch, 1.2*inch]))
+
+    rows = [["University", "Requests", "Paid", "Conversion"]]
+    for name, values in summary["universities"].items():
+        rows.append([_truncate(name or "Unknown", 45), str(values["requests"]), str(values["paid"]), rate(values)])
+    elements.append(Paragraph("By University", REPORT_HEADING_STYLE))
+    elements.append(_grid_table(rows, [3.5*inch, 1*inch, 1*inch, 1*inch]))
+
+    elements.append(Paragraph("By Status", REPORT_HEADING_STYLE))
+    for status, count in sorted(totals["statuses"].items()):
+        elements.append(Paragraph(f"{status or 'None'}: {count} requests", NORMAL_STYLE))
+
+    return _build(elements, leftMargin=0.5*inch, rightMargin=0.5*inch)
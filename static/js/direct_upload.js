@@ -0,0 +1,60 @@
+// Direct-to-storage uploads.
+//
+// Forms marked with data-direct-upload="<service>" ask the server for a
+// presigned POST before submitting. When storage supports it the file goes
+// straight to the bucket and only its stored name is sent to the app; when it
+// doesn't (local disk, 404) the form is submitted normally.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('form[data-direct-upload]').forEach(function (form) {
+        form.addEventListener('submit', async function (event) {
+            // A second click while the presign/upload is in flight would
+            // upload the file again under another name; swallow it
+            if (form.dataset.directUploadPending) {
+                event.preventDefault();
+                return;
+            }
+
+            const input = form.querySelector('input[type="file"]');
+            // Leave forms that failed validation, or were already handled, alone
+            if (event.defaultPrevented || form.dataset.directUploadDone || !input || !input.files.length) {
+                return;
+            }
+
+            event.preventDefault();
+            form.dataset.directUploadPending = '1';
+            const file = input.files[0];
+
+            try {
+                const presign = await fetch(form.dataset.presignUrl || '/uploads/presign', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ service: form.dataset.directUpload, filename: file.name })
+                });
+
+                if (presign.ok) {
+                    const target = await presign.json();
+                    const body = new FormData();
+                    Object.entries(target.fields).forEach(([key, value]) => body.append(key, value));
+                    body.append('file', file);
+
+                    const upload = await fetch(target.url, { method: 'POST', body: body });
+                    if (upload.ok) {
+                        const hidden = document.createElement('input');
+                        hidden.type = 'hidden';
+                        hidden.name = 'uploaded_file';
+                        hidden.value = target.filename;
+                        form.appendChild(hidden);
+                        // The bytes are already in storage; don't send them twice
+                        input.removeAttribute('name');
+                    }
+                }
+            } catch (error) {
+                console.warn('Direct upload failed, falling back to a normal upload', error);
+            }
+
+            form.dataset.directUploadDone = '1';
+            delete form.dataset.directUploadPending;
+            form.requestSubmit ? form.requestSubmit() : form.submit();
+        });
+    });
+});
@@ -0,0 +1,204 @@
+"""
+File storage backends for uploads.
+
+Every upload belongs to a service folder ("assignments", "quizzes", "exams",
+"payments"). ``LocalStorage`` keeps them under a directory on this machine;
+``S3Storage`` keeps them in an S3-compatible bucket (AWS, MinIO, a local moto
+server, ...) and hands out presigned URLs so browsers upload and download
+directly instead of through the app.
+"""
+
+import hashlib
+import os
+import shutil
+
+
+class StorageError(Exception):
+    pass
+
+
+class LocalStorage:
+    """Uploads stored under ``root/<service>/<filename>`` on the local disk."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def folder(self, service):
+        # Absolute so send_from_directory doesn't resolve it against app.root_path
+        return os.path.abspath(os.path.join(self.root, service))
+
+    def path(self, service, filename):
+        return os.path.join(self.folder(service), filename)
+
+    def save(self, service, filename, fileobj):
+        os.makedirs(self.folder(service), exist_ok=True)
+        with open(self.path(service, filename), "wb") as fh:
+            shutil.copyfileobj(fileobj, fh)
+
+    def open(self, service, filename):
+        return open(self.path(service, filename), "rb")
+
+    def exists(self, service, filename):
+        return os.path.exists(self.path(service, filename))
+
+    def digest(self, service, filename):
+        """Content digest of a stored file, or None if it doesn't exist."""
+        digest = hashlib.sha256()
+        try:
+            with open(self.path(service, filename), "rb") as fh:
+                while chunk := fh.read(64 * 1024):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            return None
+        return digest.hexdigest()
+
+    def delete(self, service, filename):
+        try:
+            os.remove(self.path(service, filename))
+        except FileNotFoundError:
+            pass
+
+    def list(self, service):
+        """Return ``{filename: size_in_bytes}`` for everything in a service folder."""
+        folder = self.folder(service)
+        if not os.path.isdir(folder):
+            return {}
+        with os.scandir(folder) as entries:
+            return {entry.name: entry.stat().st_size for entry in entries if entry.is_file()}
+
+    def inventory(self, service):
+        """Return ``{filename: (size_in_bytes, modified_timestamp)}`` for a service folder."""
+        folder = self.folder(service)
+        if not os.path.isdir(folder):
+            return {}
+        files = {}
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_size, stat.st_mtime)
+        return files
+
+    def download_url(self, service, filename, expires_in=300):
+        # Local files are sent by the app itself
+        return None
+
+    def presigned_upload(self, service, filename, max_size, expires_in=300):
+        return None
+
+
+class S3Storage:
+    """Uploads stored as ``<prefix><service>/<filename>`` objects in a bucket."""
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, region=None,
+                 access_key=None, secret_key=None):
+        try:
+            import boto3
+        except ImportError:
+            raise StorageError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+        )
+
+    def key(self, service, filename):
+        return f"{self.prefix}{service}/{filename}"
+
+    def save(self, service, filename, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, self.key(service, filename))
+
+    def open(self, service, filename):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.key(service, filename))["Body"]
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(self.key(service, filename))
+
+    def exists(self, service, filename):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(service, filename))
+            return True
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def digest(self, service, filename):
+        """
+        Content digest of a stored object, or None if it doesn't exist: its
+        ETag (the MD5 of a single-part upload) and size, read with a HEAD
+        rather than downloading the object.
+        """
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.key(service, filename))
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return f"{head['ETag'].strip(chr(34))}:{head['ContentLength']}"
+
+    def delete(self, service, filename):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(service, filename))
+
+    def list(self, service):
+        """Return ``{filename: size_in_bytes}`` for everything under a service prefix."""
+        prefix = self.key(service, "")
+        files = {}
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                files[obj["Key"][len(prefix):]] = obj["Size"]
+        return files
+
+    def inventory(self, service):
+        """Return ``{filename: (size_in_bytes, modified_timestamp)}`` under a service prefix."""
+        prefix = self.key(service, "")
+        files = {}
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                files[obj["Key"][len(prefix):]] = (obj["Size"], obj["LastModified"].timestamp())
+        return files
+
+    def download_url(self, service, filename, expires_in=300):
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self.key(service, filename),
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=expires_in,
+        )
+
+    def presigned_upload(self, service, filename, max_size, expires_in=300):
+        """Return ``{"url": ..., "fields": {...}}`` for a browser form POST straight to the bucket."""
+        return self.client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=self.key(service, filename),
+            Conditions=[["content-length-range", 1, max_size]],
+            ExpiresIn=expires_in,
+        )
+
+
+def create_storage(config):
+    backend = config.get("STORAGE_BACKEND", "local")
+    if backend == "local":
+        return LocalStorage(config["UPLOAD_FOLDER"])
+    if backend == "s3":
+        return S3Storage(
+            bucket=config["S3_BUCKET"],
+            prefix=config.get("S3_PREFIX", ""),
+            endpoint_url=config.get("S3_ENDPOINT_URL"),
+            region=config.get("S3_REGION"),
+            access_key=config.get("S3_ACCESS_KEY_ID"),
+            secret_key=config.get("S3_SECRET_ACCESS_KEY"),
+        )
+    raise StorageError(f"Unknown STORAGE_BACKEND: {backend}")
@@ -0,0 +1,81 @@
+"""
+Shared set-up for the test suite.
+
+main reads its configuration and creates its tables when imported, so the
+environment is pointed at a throwaway directory and SQLite database first.
+Background jobs never start on import; rate limiting is switched off.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date, datetime
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="academic-assist-tests-")
+
+os.chdir(WORKDIR)
+os.environ.update({
+    "DATABASE_URL": "sqlite:///" + os.path.join(WORKDIR, "test.db"),
+    "SECRET_KEY": "test-secret",
+    "CACHE_BACKEND": "memory",
+    "RATE_LIMIT_ENABLED": "0",
+    "RATE_LIMIT_PATH": os.path.join(WORKDIR, "limits.sqlite"),
+})
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import main  # noqa: E402
+
+REQUEST_TABLES = (main.Assignment, main.QuizRequest, main.ExamRequest, main.ArchivedRequest,
+                  main.RequestRollup, main.Submission, main.SchedulerLock)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def workdir():
+    yield WORKDIR
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    with main.app.app_context():
+        yield
+        main.db.session.rollback()
+        for model in REQUEST_TABLES:
+            model.query.delete()
+        main.db.session.commit()
+    main.cache.backend.clear()
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+@pytest.fixture
+def admin_client(client):
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    return client
+
+
+@pytest.fixture
+def make_assignment():
+    """Insert an assignment (counted in the rollups) and return its id."""
+    def make(status="Pending Payment", due_date=None, university="University of Pretoria"):
+        assignment = main.Assignment(
+            name="Student", email="student@example.com", contact="0123456789",
+            university=university, assignment_type="Essay", subject="INF3708",
+            due_date=due_date or date.today(), details="Details", status=status,
+            created_at=datetime.now(),
+        )
+        main.db.session.add(assignment)
+        main.db.session.flush()
+        main.rollup_request("assignments", assignment)
+        main.db.session.commit()
+        return assignment.id
+    return make
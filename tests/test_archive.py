@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+from io import BytesIO
+
+import main
+from test_rollups import assert_rollups_match_recount, in_other_session, pay, rollups
+
+LONG_AGO = date.today() - timedelta(days=90)
+
+
+def test_files_compressed_is_set_from_each_rows_uploads(make_assignment):
+    stored = make_assignment(due_date=LONG_AGO)
+    missing = make_assignment(due_date=LONG_AGO)
+    no_files = make_assignment(due_date=LONG_AGO)
+
+    main.storage.save("assignments", "stored.pdf", BytesIO(b"%PDF-1.4 stored"))
+    main.Assignment.query.filter_by(id=stored).update({"assignment_file": "stored.pdf"})
+    main.Assignment.query.filter_by(id=missing).update({"assignment_file": "missing.pdf"})
+    main.db.session.commit()
+
+    moved = main.archive_expired_requests(compress_files=True)
+
+    assert moved["assignments"] == 3
+    flags = {row.original_id: row.files_compressed for row in main.ArchivedRequest.query}
+    assert flags == {stored: True, missing: False, no_files: False}
+    assert main.storage.exists("assignments", "stored.pdf.gz")
+    assert not main.storage.exists("assignments", "stored.pdf")
+
+
+def test_archiver_runs_as_a_leased_background_job(monkeypatch, make_assignment):
+    make_assignment(due_date=LONG_AGO)
+    stop = main.archive_scheduler_stop
+    monkeypatch.setattr(stop, "wait", lambda timeout=None: stop.set())
+
+    main.archive_scheduler_loop(stop)
+    stop.clear()
+
+    assert main.Assignment.query.count() == 0
+    assert main.ArchivedRequest.query.count() == 1
+    # The lease is handed back when the loop stops
+    assert main.SchedulerLock.query.filter_by(name="archiver").first() is None
+
+
+def test_status_change_committed_during_the_move_is_archived(monkeypatch, make_assignment):
+    assignment_id = make_assignment(due_date=LONG_AGO)
+    delete_unchanged = main.delete_unchanged
+
+    def pay_before_delete(*args):
+        # The archiver has read the row as "Pending Payment" by now
+        monkeypatch.setattr(main, "delete_unchanged", delete_unchanged)
+        in_other_session(pay, assignment_id)
+        return delete_unchanged(*args)
+
+    monkeypatch.setattr(main, "delete_unchanged", pay_before_delete)
+    moved = main.archive_expired_requests()
+
+    assert moved["assignments"] == 1
+    assert [row.status for row in main.ArchivedRequest.query] == ["Payment Submitted"]
+    assert rollups() == {("assignments", "University of Pretoria", "Payment Submitted"): 1}
+    assert_rollups_match_recount()
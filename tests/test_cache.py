@@ -0,0 +1,64 @@
+import pytest
+
+import main
+from cache import GENERATIONS, Cache, MemoryCache, SQLiteCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return Cache(MemoryCache())
+    return Cache(SQLiteCache(str(tmp_path / "cache.sqlite")))
+
+
+def test_invalidate_hides_cached_values(cache):
+    cache.set("dashboard", "page", "old")
+    cache.invalidate("dashboard")
+    assert cache.get("dashboard", "page") is None
+
+
+def test_value_computed_before_an_invalidation_is_never_served(cache):
+    def render_during_write():
+        # A write commits and invalidates while the page is being rendered
+        cache.invalidate("dashboard")
+        return "stale"
+
+    assert cache.get_or_set("dashboard", "page", render_during_write) == "stale"
+    assert cache.get("dashboard", "page") is None
+    assert cache.get_or_set("dashboard", "page", lambda: "fresh") == "fresh"
+    assert cache.get("dashboard", "page") == "fresh"
+
+
+def test_generations_survive_the_size_limit(tmp_path):
+    cache = Cache(SQLiteCache(str(tmp_path / "cache.sqlite"), max_entries=4))
+    cache.set("dashboard", "page", "cached")
+    generation = cache.generation("dashboard")
+
+    for i in range(SQLiteCache.PRUNE_EVERY):
+        cache.set("pdf", str(i), b"pdf")
+
+    assert cache.backend.get(GENERATIONS, "dashboard") == generation
+
+
+def test_dashboard_read_from_a_replica_is_not_cached(monkeypatch, admin_client):
+    monkeypatch.setattr(main, "reads_from_replica", lambda db: True)
+    sets = main.cache.stats()["sets"]
+
+    assert admin_client.get("/dashboard").status_code == 200
+
+    assert main.cache.stats()["sets"] == sets
+
+
+def test_sqlite_stats_add_up_every_worker(tmp_path):
+    # Two workers on one node: separate Cache objects over the same file
+    path = str(tmp_path / "cache.sqlite")
+    worker, other_worker = Cache(SQLiteCache(path)), Cache(SQLiteCache(path))
+    worker.set("dashboard", "page", "cached")
+    assert other_worker.get("dashboard", "page") == "cached"
+    other_worker.get("dashboard", "missing")
+    other_worker.flush_counters()
+
+    stats = worker.stats()
+
+    assert (stats["sets"], stats["hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_ratio"] == 0.5
@@ -0,0 +1,93 @@
+"""
+Repeated form posts (double-clicks, browser retries, going back and
+resubmitting) are answered with the original result instead of a new row.
+"""
+
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+import main
+from test_rollups import assert_rollups_match_recount, in_other_session, rollups
+
+DUE = (date.today() + timedelta(days=10)).isoformat()
+
+
+def submit_assignment(client, key=None, content=b"%PDF-1.4 assignment"):
+    data = {
+        "name": "Student", "email": "student@example.com", "contact": "0123456789",
+        "university": "Wits University", "assignment_type": "Essay", "subject": "INF3708",
+        "due_date": DUE, "details": "Details",
+        "file": (BytesIO(content), "assignment.pdf"),
+    }
+    if key:
+        data["idempotency_key"] = key
+    return client.post("/submit-assignment", data=data)
+
+
+def assignment_ids():
+    return [row.id for row in main.Assignment.query.order_by(main.Assignment.id)]
+
+
+def test_resent_key_replays_the_first_submission(client):
+    first = submit_assignment(client, key="form-1")
+    second = submit_assignment(client, key="form-1")
+
+    assert len(assignment_ids()) == 1
+    assert main.Submission.query.count() == 1
+    assert second.status_code == 302 and second.location == first.location
+    with client.session_transaction() as session:
+        assert session["assignment_id"] == assignment_ids()[0]
+
+
+def test_same_content_is_deduplicated_within_the_window(client):
+    submit_assignment(client, key="form-1")
+    submit_assignment(client, key="form-2")
+    assert len(assignment_ids()) == 1
+
+    # The same content again once the window has passed is a new request
+    main.Submission.query.update({"created_at": datetime.utcnow() - timedelta(
+        minutes=main.app.config["SUBMISSION_DEDUPE_MINUTES"] + 1)})
+    main.db.session.commit()
+    submit_assignment(client, key="form-3")
+
+    assert len(assignment_ids()) == 2
+
+
+def test_key_resent_with_other_content_is_a_new_submission(client):
+    submit_assignment(client, key="form-1")
+    submit_assignment(client, key="form-1", content=b"%PDF-1.4 corrected assignment")
+
+    assert len(assignment_ids()) == 2
+    keys = [row.idempotency_key for row in main.Submission.query.order_by(main.Submission.id)]
+    assert keys == ["form-1", None]
+
+
+def test_concurrent_post_with_the_same_key_wins_the_commit(monkeypatch, client, make_assignment):
+    find_submission = main.find_submission
+    winner = {}
+
+    def other_post_commits_after_the_lookup(endpoint, fingerprint):
+        # Both posts found nothing; the other one commits first
+        monkeypatch.setattr(main, "find_submission", find_submission)
+        previous = find_submission(endpoint, fingerprint)
+
+        def other_post():
+            winner["id"] = make_assignment(university="Wits University")
+            main.db.session.add(main.Submission(idempotency_key="form-1", fingerprint=fingerprint,
+                                                endpoint=endpoint, service="assignments",
+                                                request_id=winner["id"]))
+            main.db.session.commit()
+
+        in_other_session(other_post)
+        return previous
+
+    monkeypatch.setattr(main, "find_submission", other_post_commits_after_the_lookup)
+    response = submit_assignment(client, key="form-1")
+
+    # This post's insert hit the unique key, was rolled back and replays the winner
+    assert response.status_code == 302
+    assert assignment_ids() == [winner["id"]]
+    with client.session_transaction() as session:
+        assert session["assignment_id"] == winner["id"]
+    assert rollups() == {("assignments", "Wits University", "Pending Payment"): 1}
+    assert_rollups_match_recount()
@@ -0,0 +1,30 @@
+import pytest
+
+import main
+from limits import SQLiteLimiter
+
+
+@pytest.fixture
+def limiter(monkeypatch, tmp_path):
+    limiter = SQLiteLimiter(str(tmp_path / "limits.sqlite"))
+    monkeypatch.setattr(main.app.wsgi_app, "limiter", limiter)
+    monkeypatch.setitem(main.app.config, "RATE_LIMIT_PER_IP", "2/3600")
+    return limiter
+
+
+def presign(client):
+    return client.post("/uploads/presign", json={"service": "payments", "filename": "proof.pdf"})
+
+
+def test_presign_upload_is_rate_limited(limiter, client):
+    # The local backend has no presigned uploads (404), but the limit applies first
+    assert [presign(client).status_code for _ in range(3)] == [404, 404, 429]
+
+
+def test_presigns_do_not_use_up_the_form_allowance(limiter, client):
+    presign(client)
+    presign(client)
+
+    response = client.post("/upload-proof", data={})
+
+    assert response.status_code != 429
@@ -0,0 +1,170 @@
+"""
+The analytics rollups must always equal a recount from the request tables,
+including when status writers (upload_proof, update_status, the deadline
+pass) race each other.
+"""
+
+import threading
+from datetime import date, timedelta
+from io import BytesIO
+
+import main
+
+YESTERDAY = date.today() - timedelta(days=1)
+
+
+def rollups():
+    return {(row.service, row.university, row.status): row.count
+            for row in main.RequestRollup.query if row.count}
+
+
+def assert_rollups_match_recount():
+    counted = rollups()
+    main.rebuild_request_rollups()
+    assert counted == rollups()
+
+
+def in_other_session(fn, *args):
+    """Run ``fn`` in another thread, i.e. another app context and database session."""
+    errors = []
+
+    def run():
+        with main.app.app_context():
+            try:
+                fn(*args)
+            except Exception as error:  # pragma: no cover - re-raised below
+                errors.append(error)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def pay(assignment_id):
+    assignment = main.db.session.get(main.Assignment, assignment_id)
+    main.change_status("assignments", assignment, "Payment Submitted")
+    main.db.session.commit()
+
+
+def statuses():
+    return {row.id: (row.status, row.deadline_state) for row in main.Assignment.query}
+
+
+def test_upload_proof_moves_request_to_payment_submitted(client):
+    client.post("/submit-assignment", data={
+        "name": "Student", "email": "student@example.com", "contact": "0123456789",
+        "university": "Wits University", "assignment_type": "Essay", "subject": "INF3708",
+        "due_date": (date.today() + timedelta(days=10)).isoformat(), "details": "Details",
+        "file": (BytesIO(b"%PDF-1.4 assignment"), "assignment.pdf"),
+    })
+    assert rollups() == {("assignments", "Wits University", "Pending Payment"): 1}
+
+    client.post("/upload-proof", data={"proof": (BytesIO(b"%PDF-1.4 proof"), "proof.pdf")})
+
+    assert rollups() == {("assignments", "Wits University", "Payment Submitted"): 1}
+    assert_rollups_match_recount()
+
+
+def test_update_status_counts_the_replaced_status(admin_client, make_assignment):
+    assignment_id = make_assignment()
+
+    admin_client.post(f"/update-status/assignment/{assignment_id}", data={"status": "Completed"})
+
+    assert statuses()[assignment_id][0] == "Completed"
+    assert rollups() == {("assignments", "University of Pretoria", "Completed"): 1}
+    assert_rollups_match_recount()
+
+
+def test_delete_uncounts_the_request(admin_client, make_assignment):
+    assignment_id = make_assignment(status="In Progress")
+
+    admin_client.post(f"/delete/assignment/{assignment_id}")
+
+    assert rollups() == {}
+    assert_rollups_match_recount()
+
+
+def test_deadline_pass_expires_only_unpaid_requests(make_assignment):
+    unpaid = make_assignment(due_date=YESTERDAY)
+    paid = make_assignment(status="Payment Submitted", due_date=YESTERDAY)
+
+    changed = main.run_deadline_transitions()
+
+    assert changed["assignments"] == 2
+    assert statuses() == {unpaid: ("Expired", "expired"), paid: ("Payment Submitted", "expired")}
+    assert_rollups_match_recount()
+
+
+def test_deadline_pass_keeps_a_payment_made_after_it_read_the_row(monkeypatch, make_assignment):
+    assignment_id = make_assignment(due_date=YESTERDAY)
+    deadline_state_for = main.deadline_state_for
+
+    def pay_while_pass_runs(*args):
+        # The pass has read the row as "Pending Payment" by now
+        monkeypatch.setattr(main, "deadline_state_for", deadline_state_for)
+        in_other_session(pay, assignment_id)
+        return deadline_state_for(*args)
+
+    monkeypatch.setattr(main, "deadline_state_for", pay_while_pass_runs)
+    main.run_deadline_transitions()
+
+    assert statuses()[assignment_id] == ("Payment Submitted", "expired")
+    assert rollups() == {("assignments", "University of Pretoria", "Payment Submitted"): 1}
+    assert_rollups_match_recount()
+
+
+def test_overlapping_deadline_passes_apply_each_transition_once(monkeypatch, make_assignment):
+    assignment_id = make_assignment(due_date=YESTERDAY)
+    deadline_state_for = main.deadline_state_for
+    other_pass = {}
+
+    def run_other_pass(*args):
+        monkeypatch.setattr(main, "deadline_state_for", deadline_state_for)
+        in_other_session(lambda: other_pass.update(main.run_deadline_transitions()))
+        return deadline_state_for(*args)
+
+    monkeypatch.setattr(main, "deadline_state_for", run_other_pass)
+    changed = main.run_deadline_transitions()
+
+    assert changed["assignments"] + other_pass["assignments"] == 1
+    assert statuses()[assignment_id] == ("Expired", "expired")
+    assert rollups() == {("assignments", "University of Pretoria", "Expired"): 1}
+    assert_rollups_match_recount()
+
+
+def test_status_change_after_the_deadline_pass_expired_the_row(make_assignment):
+    assignment_id = make_assignment(due_date=YESTERDAY)
+    assignment = main.db.session.get(main.Assignment, assignment_id)
+    assert assignment.status == "Pending Payment"
+
+    in_other_session(main.run_deadline_transitions)
+    main.change_status("assignments", assignment, "Payment Submitted")
+    main.db.session.commit()
+
+    assert statuses()[assignment_id] == ("Payment Submitted", "expired")
+    assert rollups() == {("assignments", "University of Pretoria", "Payment Submitted"): 1}
+    assert_rollups_match_recount()
+
+
+def test_backfill_runs_once(make_assignment):
+    make_assignment()
+    main.RequestRollup.query.delete()
+    main.db.session.commit()
+
+    main.ensure_rollups()
+    main.ensure_rollups()
+
+    assert rollups() == {("assignments", "University of Pretoria", "Pending Payment"): 1}
+
+
+def test_backfill_is_left_to_the_process_holding_its_lease(make_assignment):
+    make_assignment()
+    main.RequestRollup.query.delete()
+    main.db.session.commit()
+    assert main.acquire_scheduler_lock("rollup-backfill", "other-host:1", timedelta(minutes=10))
+
+    main.ensure_rollups()
+
+    assert rollups() == {}
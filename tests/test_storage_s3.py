@@ -0,0 +1,130 @@
+"""
+S3Storage against a local moto server, the same stand-in S3_ENDPOINT_URL
+can point the app at in development.
+"""
+
+import base64
+import json
+from datetime import date, timedelta
+from io import BytesIO
+
+import pytest
+
+import main
+from storage import S3Storage
+
+moto_server = pytest.importorskip("moto.server")
+requests = pytest.importorskip("requests")
+
+BUCKET = "academic-assist-test"
+
+
+@pytest.fixture(scope="module")
+def endpoint_url():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3(endpoint_url):
+    storage = S3Storage(BUCKET, prefix="uploads/", endpoint_url=endpoint_url, region="us-east-1",
+                        access_key="testing", secret_key="testing")
+    storage.client.create_bucket(Bucket=BUCKET)
+    yield storage
+    for page in storage.client.get_paginator("list_objects_v2").paginate(Bucket=BUCKET):
+        for obj in page.get("Contents", []):
+            storage.client.delete_object(Bucket=BUCKET, Key=obj["Key"])
+
+
+@pytest.fixture
+def app_s3(monkeypatch, s3):
+    monkeypatch.setattr(main, "storage", s3)
+    return s3
+
+
+def test_round_trip(s3):
+    s3.save("payments", "proof.pdf", BytesIO(b"%PDF-1.4 proof"))
+
+    assert s3.exists("payments", "proof.pdf")
+    assert not s3.exists("payments", "other.pdf")
+    with s3.open("payments", "proof.pdf") as fh:
+        assert fh.read() == b"%PDF-1.4 proof"
+    assert s3.list("payments") == {"proof.pdf": 14}
+    assert s3.inventory("payments")["proof.pdf"][0] == 14
+    assert requests.get(s3.download_url("payments", "proof.pdf")).content == b"%PDF-1.4 proof"
+
+    s3.delete("payments", "proof.pdf")
+    assert not s3.exists("payments", "proof.pdf")
+    with pytest.raises(FileNotFoundError):
+        s3.open("payments", "proof.pdf")
+
+
+def test_presigned_upload(s3):
+    presigned = s3.presigned_upload("exams", "exam.pdf", max_size=16)
+
+    # moto doesn't enforce POST policies, so check the size condition is signed in
+    policy = json.loads(base64.b64decode(presigned["fields"]["policy"]))
+    assert ["content-length-range", 1, 16] in policy["conditions"]
+
+    response = requests.post(presigned["url"], data=presigned["fields"], files={"file": b"%PDF-1.4"})
+    assert response.status_code == 204
+    assert s3.exists("exams", "exam.pdf")
+
+
+def submit_assignment(client, uploaded_file):
+    client.post("/submit-assignment", data={
+        "name": "Student", "email": "student@example.com", "contact": "0123456789",
+        "university": "Wits University", "assignment_type": "Essay", "subject": "INF3708",
+        "due_date": (date.today() + timedelta(days=10)).isoformat(), "details": "Details",
+        "uploaded_file": uploaded_file,
+    })
+    return main.Assignment.query.order_by(main.Assignment.id.desc()).first()
+
+
+def test_direct_upload_is_attached_to_the_form(app_s3, client):
+    target = client.post("/uploads/presign", json={"service": "assignments", "filename": "essay.pdf"}).get_json()
+    requests.post(target["url"], data=target["fields"], files={"file": b"%PDF-1.4 essay"})
+
+    assignment = submit_assignment(client, target["filename"])
+
+    assert assignment.assignment_file == target["filename"]
+
+
+def test_uploaded_file_must_come_from_this_sessions_presign(app_s3, client):
+    # An existing object somebody else uploaded
+    app_s3.save("assignments", "0123456789abcdef_theirs.pdf", BytesIO(b"%PDF-1.4 theirs"))
+
+    assignment = submit_assignment(client, "0123456789abcdef_theirs.pdf")
+
+    assert assignment.assignment_file is None
+
+
+def test_local_storage_never_accepts_uploaded_file(client):
+    main.storage.save("assignments", "0123456789abcdef_theirs.pdf", BytesIO(b"%PDF-1.4 theirs"))
+
+    assignment = submit_assignment(client, "0123456789abcdef_theirs.pdf")
+
+    assert assignment.assignment_file is None
+
+
+def test_double_submitted_direct_upload_creates_one_request(app_s3, client):
+    # Each click presigns and uploads the same file under a new random name
+    for _ in range(2):
+        target = client.post("/uploads/presign", json={"service": "assignments", "filename": "essay.pdf"}).get_json()
+        requests.post(target["url"], data=target["fields"], files={"file": b"%PDF-1.4 essay"})
+        submit_assignment(client, target["filename"])
+
+    assert main.Assignment.query.count() == 1
+
+
+def test_digest_identifies_content(s3):
+    s3.save("payments", "first.pdf", BytesIO(b"%PDF-1.4 proof"))
+    s3.save("payments", "second.pdf", BytesIO(b"%PDF-1.4 proof"))
+    s3.save("payments", "other.pdf", BytesIO(b"%PDF-1.4 other"))
+
+    assert s3.digest("payments", "first.pdf") == s3.digest("payments", "second.pdf")
+    assert s3.digest("payments", "first.pdf") != s3.digest("payments", "other.pdf")
+    assert s3.digest("payments", "missing.pdf") is None
@@ -0,0 +1,104 @@
+import os
+import time
+from io import BytesIO
+
+import pytest
+
+import main
+from storage import LocalStorage
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    storage = LocalStorage(str(tmp_path / "uploads"))
+    monkeypatch.setattr(main, "storage", storage)
+    return storage
+
+
+def upload(storage, service, filename, size=10, age=2 * DAY):
+    storage.save(service, filename, BytesIO(b"x" * size))
+    modified = time.time() - age
+    os.utime(storage.path(service, filename), (modified, modified))
+
+
+def archive(service, request_file=None, proof_of_payment=None):
+    main.db.session.add(main.ArchivedRequest(
+        service=service, original_id=1, name="Student", university="University of Pretoria",
+        status="Completed", request_file=request_file, proof_of_payment=proof_of_payment,
+    ))
+    main.db.session.commit()
+
+
+def stored(storage, service):
+    return set(storage.list(service))
+
+
+def test_referenced_uploads_are_kept(storage, make_assignment):
+    assignment_id = make_assignment()
+    main.Assignment.query.filter_by(id=assignment_id).update(
+        {"assignment_file": "hot.pdf", "proof_of_payment": "hot-proof.pdf"})
+    main.db.session.commit()
+    archive("assignments", request_file="archived.pdf", proof_of_payment="archived-proof.pdf")
+    for filename in ("hot.pdf", "archived.pdf", "archived.pdf.gz", "orphan.pdf"):
+        upload(storage, "assignments", filename)
+    for filename in ("hot-proof.pdf", "archived-proof.pdf.gz", "orphan.pdf"):
+        upload(storage, "payments", filename)
+
+    main.sweep_uploads(grace_hours=24)
+
+    assert stored(storage, "assignments") == {"hot.pdf", "archived.pdf", "archived.pdf.gz"}
+    assert stored(storage, "payments") == {"hot-proof.pdf", "archived-proof.pdf.gz"}
+
+
+def test_orphans_are_kept_for_the_grace_period(storage):
+    upload(storage, "quizzes", "uploading.pdf", age=HOUR)
+    upload(storage, "quizzes", "abandoned.pdf", age=2 * DAY)
+
+    report = main.sweep_uploads(grace_hours=24)
+
+    assert stored(storage, "quizzes") == {"uploading.pdf"}
+    assert report["services"]["quizzes"]["orphaned"]["files"] == 2
+    assert report["services"]["quizzes"]["reclaimed"]["files"] == 1
+
+
+def test_dry_run_deletes_nothing(storage):
+    upload(storage, "exams", "abandoned.pdf", age=2 * DAY)
+
+    report = main.sweep_uploads(grace_hours=24, dry_run=True)
+
+    assert stored(storage, "exams") == {"abandoned.pdf"}
+    assert report["dry_run"]
+    assert report["totals"]["reclaimed"] == {"files": 1, "bytes": 10}
+
+
+def test_report_totals(storage, make_assignment):
+    assignment_id = make_assignment()
+    main.Assignment.query.filter_by(id=assignment_id).update({"assignment_file": "kept.pdf"})
+    main.db.session.commit()
+    upload(storage, "assignments", "kept.pdf", size=100, age=HOUR)
+    upload(storage, "assignments", "week.pdf", size=20, age=3 * DAY)
+    upload(storage, "assignments", "old.pdf", size=30, age=100 * DAY)
+    upload(storage, "payments", "month.pdf", size=5, age=10 * DAY)
+
+    report = main.sweep_uploads(grace_hours=24)
+
+    assignments = report["services"]["assignments"]
+    assert (assignments["files"], assignments["bytes"]) == (3, 150)
+    assert assignments["referenced"] == {"files": 1, "bytes": 100}
+    assert assignments["orphaned"] == {"files": 2, "bytes": 50}
+    assert assignments["reclaimed"] == {"files": 2, "bytes": 50}
+    assert assignments["ages"] == {
+        "<1d": {"files": 1, "bytes": 100}, "1-7d": {"files": 1, "bytes": 20},
+        "7-30d": {"files": 0, "bytes": 0}, "30-90d": {"files": 0, "bytes": 0},
+        ">90d": {"files": 1, "bytes": 30},
+    }
+    assert report["services"]["payments"]["ages"]["7-30d"] == {"files": 1, "bytes": 5}
+    assert report["services"]["quizzes"]["files"] == 0
+    assert report["totals"] == {
+        "files": 4, "bytes": 155,
+        "orphaned": {"files": 3, "bytes": 55},
+        "reclaimed": {"files": 3, "bytes": 55},
+    }